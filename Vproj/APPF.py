@@ -1,26 +1,139 @@
-import pandas as pd
+import numpy as np
+import pyarrow.compute as pc
 import plotly.graph_objects as go
+import plotly.utils
 import dash
 from dash import dcc, html, Input, Output, State
 import dash.exceptions
+import flask
 import os
+import json
+import threading
 from math import log
+from functools import lru_cache, cached_property
+from collections import Counter
+from time import perf_counter, sleep
+from payload_cache import ArrayCache, PayloadCache, PAYLOAD_CACHE_MAX_BYTES
+from response_compression import ResponseCompressor
+from arrow_store import ArrowStore, file_signature, to_numpy
 import plotly.graph_objects as go
 
+# Seconds spent in each step of module init since the previous mark, served by
+# /_startup-stats; imports are profiled separately (benchmarks.py startup).
+startup_profile = {}
+startup_lap = perf_counter()
+
+def startup_mark(step):
+    global startup_lap
+    now = perf_counter()
+    startup_profile[step] = now - startup_lap
+    startup_lap = now
+
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 
 server = app.server
 
 CSV_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.csv"
+PARQUET_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.parquet"
+ARROW_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.arrow"
+AGGREGATES_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.aggregates.json"
+SPRITE_DIR = r"C:\Users\kubag\Desktop\Vproj\sprites"
+SPRITE_MAX_AGE = 365 * 24 * 60 * 60
+FAMILY_TREE_CACHE_SIZE = 512
+FILTER_CACHE_MAX_BYTES = 16 * 1024 * 1024
+GALLERY_PAGE_SIZE = 48
+DROPDOWN_OPTION_LIMIT = 50
+RELOAD_INTERVAL_S = 5
+STATS_ROUTES = os.environ.get("STATS_ROUTES") == "1"
+
+# Thumbnails written by fetch_sprites.py; anything missing falls back to the remote artwork.
+local_sprites = set(os.listdir(SPRITE_DIR)) if os.path.isdir(SPRITE_DIR) else set()
+
+@server.route("/sprites/<path:filename>")
+def serve_sprite(filename):
+    response = flask.send_from_directory(os.path.abspath(SPRITE_DIR), filename, max_age=SPRITE_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={SPRITE_MAX_AGE}, immutable"
+    return response
+
+compressor = ResponseCompressor()
+
+def add_validators(response):
+    """ETag and Cache-Control for the layout, dependencies and component scripts, answering If-None-Match with a 304.
+
+    The index page is left alone: Dash puts a per-request token in it, so it would never match.
+    """
+    request = flask.request
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+    prefix = app.config.routes_pathname_prefix
+    if request.path in (prefix + "_dash-layout", prefix + "_dash-dependencies"):
+        response.add_etag()
+        # Both can change with a data reload or a restart: browsers keep them but revalidate every time.
+        response.cache_control.no_cache = True
+    elif request.path.startswith(prefix + "_dash-component-suites/"):
+        if response.get_etag()[0] is None:
+            response.add_etag()
+        if response.cache_control.max_age:
+            # Fingerprinted: a new version of the script gets a new URL.
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+    else:
+        return response
+    return response.make_conditional(request)
+
+@server.after_request
+def finish_response(response):
+    # Validators first so a 304 is never compressed and the ETag is taken from the plain body.
+    return compressor.compress(add_validators(response), flask.request.accept_encodings)
+
+def sprite_src(pokemon, size):
+    name = f"{int(pokemon['id'])}_{size}.webp"
+    if name in local_sprites:
+        return app.get_relative_path(f"/sprites/{name}")
+    return pokemon["sprite_url"]
+
+def parquet_is_current():
+    if not os.path.exists(PARQUET_PATH):
+        return False
+    return not os.path.exists(CSV_PATH) or os.path.getmtime(PARQUET_PATH) >= os.path.getmtime(CSV_PATH)
+
+def arrow_is_current():
+    if not os.path.exists(ARROW_PATH):
+        return False
+    return all(not os.path.exists(path) or os.path.getmtime(ARROW_PATH) >= os.path.getmtime(path)
+               for path in (CSV_PATH, PARQUET_PATH))
+
+def load_store():
+    """The dataset as an ArrowStore: the memory-mapped IPC file when it is current, otherwise built from
+    Parquet/CSV via load_pokemon_data() (private to this process)."""
+    if arrow_is_current():
+        try:
+            print(f"Mapping data from: {ARROW_PATH}")
+            store = ArrowStore.open(ARROW_PATH)
+            print(f"Successfully mapped {len(store)} Pokémon records")
+            return store
+        except Exception as e:
+            print(f"\nERROR MAPPING DATA: {str(e)}")
+    df = load_pokemon_data()
+    return ArrowStore.from_frame(df, df.attrs.get("source"))
+
+def load_pokemon_data(path=None):
+    # pandas is only needed when there is no current Arrow file to map.
+    import pandas as pd
 
-def load_pokemon_data():
     try:
-        print(f"Attempting to load data from: {CSV_PATH}")
+        # The typed Parquet file from clean_data1.py needs no coercion pass;
+        # the CSV is only parsed when the Parquet file is missing or older.
+        if path is None:
+            path = PARQUET_PATH if parquet_is_current() else CSV_PATH
+        print(f"Attempting to load data from: {path}")
         
-        if not os.path.exists(CSV_PATH):
-            raise FileNotFoundError(f"File not found at: {CSV_PATH}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found at: {path}")
         
-        df = pd.read_csv(CSV_PATH)
+        is_csv = path.endswith(".csv")
+        df = pd.read_csv(path) if is_csv else pd.read_parquet(path)
+        df.attrs["source"] = path
         print(f"Successfully loaded {len(df)} Pokémon records")
         
         required_columns = ['id', 'name', 'evolution_chain_id', 'sprite_url', 
@@ -32,95 +145,412 @@ def load_pokemon_data():
             if col not in df.columns:
                 raise ValueError(f"Missing required column: {col}")
         
-        numeric_cols = ['id', 'evolution_chain_id', 'hp', 'attack', 'defense', 
-                       'special-attack', 'special-defense', 'speed', 'height', 'weight']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        if is_csv:
+            numeric_cols = ['id', 'evolution_chain_id', 'hp', 'attack', 'defense', 
+                           'special-attack', 'special-defense', 'speed', 'height', 'weight']
+            for col in numeric_cols:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
         
         return df.sort_values("id")
         
     except Exception as e:
         print(f"\nERROR LOADING DATA: {str(e)}")
         return pd.DataFrame()
-def create_gallery_view(df):
-    filtered_df = df[df["type_1"].notna()]
-    cards = []
+def load_aggregates(store):
+    """Global-view aggregates from clean_data1.py's sidecar, recomputed if it is missing or stale.
 
-    for _, row in filtered_df.iterrows():
-        cards.append(html.Div([
-            html.Img(
-                src=row["sprite_url"],
-                id={'type': 'gallery_img', 'index': int(row["id"])},
-                style={
-                    'height': '100px',
-                    'width': '100px',
-                    'cursor': 'pointer',
-                    'borderRadius': '10px',
-                    'border': '2px solid transparent',
-                    'transition': 'transform 0.2s',
-                }
+    The sidecar records the size and mtime of the files it was computed from,
+    so a re-clean (or a hand-edited CSV) invalidates it.
+    """
+    if not store:
+        return None
+    try:
+        with open(AGGREGATES_PATH) as f:
+            aggregates = json.load(f)
+        data_dir = os.path.dirname(AGGREGATES_PATH)
+        for name, signature in aggregates["sources"].items():
+            if file_signature(os.path.join(data_dir, name)) != signature:
+                raise ValueError(f"{name} changed since the aggregates were computed")
+        print(f"Loaded global aggregates from: {AGGREGATES_PATH}")
+        return aggregates
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Aggregates unavailable ({e}), computing them from the loaded data")
+        from clean_data1 import compute_aggregates
+        return compute_aggregates(store.frame())
+
+def dataset_version(store):
+    """Identifies the loaded data file's contents and the aggregates sidecar's; changes whenever either is rewritten."""
+    if not store:
+        return None
+    aggregates = tuple(file_signature(AGGREGATES_PATH)) if os.path.exists(AGGREGATES_PATH) else None
+    return (store.source, *file_signature(store.source), aggregates)
+
+def data_files_signature():
+    # Every file a Dataset can be built from; None for a missing one.
+    return tuple(file_signature(path) if os.path.exists(path) else None
+                 for path in (ARROW_PATH, PARQUET_PATH, CSV_PATH, AGGREGATES_PATH))
+
+class FigureCache:
+    """Figures that depend only on the dataset, built once per dataset version.
+
+    Figures are stored as plain JSON dicts, so a request that reuses one skips
+    both building the go.Figure and plotly's validation of it. Asking with a
+    new version drops everything built for the old one.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.figures = {}
+        self.builds = 0
+
+    def get(self, version, key, build):
+        if version != self.version:
+            self.figures = {}
+            self.version = version
+        figure = self.figures.get(key)
+        if figure is None:
+            figure = self.figures[key] = json.loads(json.dumps(build(), cls=plotly.utils.PlotlyJSONEncoder))
+            self.builds += 1
+        return figure
+
+class Dataset:
+    """One version of the data and everything derived from it.
+
+    A Dataset is not changed once published: a reload builds and warms a new
+    one, then rebinds the module-level `dataset`. Callbacks read that global
+    once and use the same Dataset for the whole request, so they never mix
+    two versions, and caches keyed by the Dataset or its version never hand
+    one version's results to another.
+    """
+
+    def __init__(self, store, files=None):
+        self.store = store
+        self.files = files
+        self.version = dataset_version(store)
+        self.figures = FigureCache()
+
+    @cached_property
+    def aggregates(self):
+        # Loaded on first use rather than at startup: only the global views need them.
+        return load_aggregates(self.store)
+
+    def warm(self):
+        """Build the indexes and figures that the first requests would otherwise build."""
+        if not self.store:
+            return
+        gallery_types(self)
+        filter_gallery(self, "", None)
+        cached_type_donut(self)
+        cached_happiness_scatter(self)
+        for stat in self.aggregates['stats']:
+            cached_stat_histogram(self, stat)
+
+def load_dataset():
+    files = data_files_signature()
+    return Dataset(load_store(), files)
+
+def gender_slices(p):
+    """Pie labels/values from the cleaner's numeric male_pct/female_pct columns."""
+    if p["is_genderless"]:
+        return ['Genderless'], [100]
+    slices = [(label, float(p[col])) for label, col in (('Male', 'male_pct'), ('Female', 'female_pct')) if p[col] > 0]
+    return [label for label, _ in slices], [value for _, value in slices]
+
+def filter_gallery(data, search, type_filter):
+    """Store positions of the gallery cards matching a name search and type, in id order.
+
+    Searches are normalised first, so "Char", "char " and "char" share one
+    entry in filter_cache, which is bounded by the bytes of the position
+    arrays rather than their number (they grow with the row count).
+    """
+    search = (search or "").strip().lower()
+    type_filter = type_filter or None
+    return filter_cache.get((data, search, type_filter), lambda: match_gallery(data, search, type_filter))
+
+def match_gallery(data, search, type_filter):
+    # Arrow compute kernels over the mapped columns of `data`'s store.
+    store = data.store
+    table = store.table
+    mask = pc.is_valid(table.column("type_1"))
+    if search:
+        mask = pc.and_(mask, pc.match_substring(pc.utf8_lower(table.column("name")), search))
+    if type_filter:
+        is_type = pc.or_(pc.fill_null(pc.equal(table.column("type_1"), type_filter), False),
+                         pc.fill_null(pc.equal(table.column("type_2"), type_filter), False))
+        mask = pc.and_(mask, is_type)
+    positions = to_numpy(pc.indices_nonzero(mask))
+    if store.order is not None:
+        positions = positions[np.argsort(store.take("id", positions), kind="stable")]
+    return positions
+
+@lru_cache(maxsize=2)
+def gallery_types(data):
+    table = data.store.table
+    types = pc.unique(table.column("type_1")).to_pylist() + pc.unique(table.column("type_2")).to_pylist()
+    return sorted({t for t in types if t is not None})
+
+def create_gallery_card(pokemon):
+    return html.Div([
+        html.Img(
+            src=sprite_src(pokemon, 100),
+            id={'type': 'gallery_img', 'index': int(pokemon["id"])},
+            style={
+                'height': '100px',
+                'width': '100px',
+                'cursor': 'pointer',
+                'borderRadius': '10px',
+                'border': '2px solid transparent',
+                'transition': 'transform 0.2s',
+            }
+        ),
+        html.Div(pokemon["name"].capitalize(), style={'textAlign': 'center', 'marginTop': '5px'})
+    ], style={'textAlign': 'center', 'width': '120px', 'margin': '10px'})
+
+def gallery_page(data, search, type_filter, page):
+    """Cards for one page of the filtered gallery, plus the clamped page number and page count."""
+    matches = filter_gallery(data, search, type_filter)
+    pages = max(1, -(-len(matches) // GALLERY_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    visible = matches[page * GALLERY_PAGE_SIZE:(page + 1) * GALLERY_PAGE_SIZE]
+    return [create_gallery_card(data.store.row_at(int(pos))) for pos in visible], page, pages, len(matches)
+
+def gallery_page_label(page, pages, matches):
+    return f"Page {page + 1} of {pages} ({matches} Pokémon)"
+
+def pokemon_options(data, search, value=None):
+    """Dropdown options for the names containing `search`, capped at DROPDOWN_OPTION_LIMIT.
+
+    The current value is always included so the dropdown can show it.
+    """
+    store = data.store
+    positions = filter_gallery(data, search, None)[:DROPDOWN_OPTION_LIMIT].tolist()
+    ids = store.take("id", positions).tolist()
+    names = [store.table.column("name")[pos].as_py() for pos in positions]
+    options = [{"label": name.capitalize(), "value": pokemon_id} for pokemon_id, name in zip(ids, names)]
+    if value is not None and value not in ids and value in store:
+        options.insert(0, {"label": store[value]["name"].capitalize(), "value": value})
+    return options
+
+def create_gallery_view(data):
+    # Only the first page is rendered here; paging and filtering go through update_gallery.
+    cards, page, pages, matches = gallery_page(data, "", None, 0)
+    type_options = gallery_types(data)
+    button_style = {'padding': '5px 15px', 'cursor': 'pointer'}
+
+    return html.Div([
+        dcc.Store(id='gallery_page', data=page),
+        html.Div([
+            dcc.Input(
+                id='gallery_search',
+                type='text',
+                placeholder='Search by name...',
+                debounce=True,
+                style={'width': '220px', 'padding': '5px'}
+            ),
+            dcc.Dropdown(
+                id='gallery_type',
+                options=[{'label': t.capitalize(), 'value': t} for t in type_options],
+                placeholder='Any type',
+                style={'width': '200px'}
             ),
-            html.Div(row["name"].capitalize(), style={'textAlign': 'center', 'marginTop': '5px'})
-        ], style={'textAlign': 'center', 'width': '120px', 'margin': '10px'}))
-
-    return html.Div(cards, style={
-        'display': 'flex',
-        'flexWrap': 'wrap',
-        'justifyContent': 'center',
-        'gap': '10px'
-    })
-
-df = load_pokemon_data()
-pokemon_options = [{"label": row["name"].capitalize(), "value": row["id"]} 
-                  for _, row in df.iterrows()] if not df.empty else []
-id_to_name = dict(zip(df["id"], df["name"])) if not df.empty else {}
-name_to_id = dict(zip(df["name"], df["id"])) if not df.empty else {}
-
-def create_evolution_tree(pokemon_id, df):
+        ], style={'display': 'flex', 'justifyContent': 'center', 'gap': '10px', 'marginBottom': '10px'}),
+        html.Div([
+            html.Button("Previous", id='gallery_prev', disabled=page == 0, style=button_style),
+            html.Span(gallery_page_label(page, pages, matches), id='gallery_page_label'),
+            html.Button("Next", id='gallery_next', disabled=page >= pages - 1, style=button_style),
+        ], style={'display': 'flex', 'justifyContent': 'center', 'alignItems': 'center', 'gap': '15px'}),
+        html.Div(cards, id='gallery_cards', style={
+            'display': 'flex',
+            'flexWrap': 'wrap',
+            'justifyContent': 'center',
+            'gap': '10px'
+        })
+    ])
+
+startup_mark("dash_app")
+
+# The current Dataset; rows are looked up through its ArrowStore. Startup only
+# maps the file and builds no per-row Python objects; the aggregates, dropdown
+# options and figures are built on first use.
+dataset = load_dataset()
+startup_mark("load_dataset")
+payload_cache = PayloadCache(PAYLOAD_CACHE_MAX_BYTES)
+filter_cache = ArrayCache(FILTER_CACHE_MAX_BYTES)
+
+reload_lock = threading.Lock()
+watcher_lock = threading.Lock()
+watcher_pid = None
+reload_stats = {"reloads": 0, "failures": 0, "last_error": None, "last_build_s": None}
+
+def reload_dataset():
+    """Build a Dataset from the data files as they are now and publish it if its version is new.
+
+    Runs in the calling (watcher) thread: requests are served from the current
+    Dataset until the new one is completely built and warmed, and publishing
+    it is a single rebinding of `dataset`.
+    """
+    global dataset
+    with reload_lock:
+        start = perf_counter()
+        new = load_dataset()
+        if not new.store:
+            raise ValueError("the data files could not be loaded")
+        if new.version == dataset.version:
+            return False
+        # The old Dataset's entries are of no use once the new one is
+        # published, so drop them before warming rather than after, which
+        # would throw the warm-up away too (these caches are keyed by the
+        # Dataset or its version). A request still running on the old Dataset
+        # can add a few more; nothing looks them up, and they age out of these
+        # bounded caches (keeping the old store mapped until they do).
+        filter_cache.clear()
+        gallery_types.cache_clear()
+        render_family.cache_clear()
+        payload_cache.clear()
+        new.warm()
+        dataset = new
+        reload_stats["reloads"] += 1
+        reload_stats["last_build_s"] = perf_counter() - start
+        print(f"Reloaded {len(new.store)} Pokémon records from {new.store.source} in {reload_stats['last_build_s']:.2f}s")
+        return True
+
+def watch_data_files(interval):
+    """Reload whenever the data files change, once they have stayed unchanged for a whole interval.
+
+    Waiting for them to settle keeps a re-clean that is still writing from
+    being loaded half-done.
+    """
+    loaded = dataset.files
+    previous = data_files_signature()
+    while True:
+        sleep(interval)
+        current = data_files_signature()
+        if current != previous:
+            previous = current
+            continue
+        if current == loaded:
+            continue
+        try:
+            reload_dataset()
+            loaded = current
+        except Exception as e:
+            reload_stats["failures"] += 1
+            reload_stats["last_error"] = str(e)
+            print(f"\nERROR RELOADING DATA: {str(e)}")
+
+@server.before_request
+def start_reload_watcher():
+    # Started by the first request of each process: threads don't survive
+    # gunicorn's fork, and the dev server's reloader parent never serves.
+    global watcher_pid
+    if watcher_pid == os.getpid():
+        return
+    with watcher_lock:
+        if watcher_pid != os.getpid():
+            watcher_pid = os.getpid()
+            threading.Thread(target=watch_data_files, args=(RELOAD_INTERVAL_S,), name="data-reload", daemon=True).start()
+
+# Server callback requests per output since startup, to compare request counts per session.
+callback_requests = Counter()
+
+def register_stats_routes():
+    """Diagnostic routes (request counts, cache and compression counters, startup
+    steps, data version). They expose server paths and errors, so they are only
+    served by the debug dev server or with STATS_ROUTES=1 in the environment."""
+
+    @server.before_request
+    def count_callback_requests():
+        if flask.request.path.endswith("/_dash-update-component"):
+            body = flask.request.get_json(silent=True) or {}
+            callback_requests[body.get("output", "?")] += 1
+
+    @server.route("/_callback-stats")
+    def callback_stats():
+        return flask.jsonify(total=sum(callback_requests.values()), by_output=dict(callback_requests))
+
+    @server.route("/_cache-stats")
+    def cache_stats():
+        # Hit/miss/eviction counters and byte usage, for sizing PAYLOAD_CACHE_MAX_BYTES under real traffic.
+        return flask.jsonify(dict(payload_cache.report(), filters=filter_cache.report()))
+
+    @server.route("/_compression-stats")
+    def compression_stats():
+        return flask.jsonify(compressor.report())
+
+    @server.route("/_startup-stats")
+    def startup_stats():
+        return flask.jsonify(total=sum(startup_profile.values()), steps=startup_profile)
+
+    @server.route("/_data-version")
+    def data_version_stats():
+        data = dataset
+        return flask.jsonify(version=data.version, rows=len(data.store), **reload_stats)
+
+if STATS_ROUTES:
+    register_stats_routes()
+
+def family_stages(data, chain_id):
+    """Member ids of one evolution chain grouped by stage, in stage then id order."""
+    store = data.store
+    positions = store.where("evolution_chain_id", chain_id)
+    ids = store.take("id", positions)
+    stages = store.take("evolution_stage", positions)
+    order = np.lexsort((ids, stages))
+    groups = {}
+    for stage, pokemon_id in zip(stages[order].tolist(), ids[order].tolist()):
+        groups.setdefault(stage, []).append(pokemon_id)
+    return list(groups.values())
+
+def create_evolution_node(evo, is_current):
+    return html.Div([
+        html.Img(
+            src=sprite_src(evo, 70),
+            style={
+                "height": "70px",
+                "width": "70px",
+                "borderRadius": "50%",
+                "border": "3px solid orange" if is_current else "2px solid #aaa",
+                "margin": "5px auto",
+                "cursor": "pointer",
+                "background": "white",
+                "display": "block"
+            },
+            id={'type': 'evo_img', 'index': int(evo["id"])}
+        ),
+        html.Div(
+            evo["name"].capitalize(), 
+            style={
+                "textAlign": "center",
+                "fontSize": "14px",
+                "fontWeight": "bold" if is_current else "normal",
+                "marginBottom": "10px"
+            }
+        )
+    ])
+
+@lru_cache(maxsize=FAMILY_TREE_CACHE_SIZE)
+def render_family(data, chain_id):
+    # Unhighlighted nodes for a whole family; shared between requests, so never mutated.
+    return tuple(
+        tuple((evo_id, create_evolution_node(data.store[evo_id], False)) for evo_id in stage)
+        for stage in family_stages(data, chain_id)
+    )
+
+def create_evolution_tree(data, pokemon_id):
     try:
-        p = df[df["id"] == pokemon_id].iloc[0]
-        if 'evolution_chain_id' not in p or pd.isna(p['evolution_chain_id']):
+        p = data.store[pokemon_id]
+        if p.get('evolution_chain_id') is None:
             return None
-            
-        family = df[df["evolution_chain_id"] == p["evolution_chain_id"]]
-        if "evolution_stage" in family.columns:
-            family = family.sort_values("evolution_stage")
-        
-        stages = family['evolution_stage'].unique()
+
+        # Only the current member's node is built per request; the rest come from the family cache.
+        stages = render_family(data, int(p['evolution_chain_id']))
         tree = []
         
-        for stage in sorted(stages):
-            stage_pokemon = family[family['evolution_stage'] == stage]
-            stage_nodes = []
-            
-            for _, evo in stage_pokemon.iterrows():
-                is_current = evo["id"] == pokemon_id
-                node = html.Div([
-                    html.Img(
-                        src=evo["sprite_url"],
-                        style={
-                            "height": "70px",
-                            "width": "70px",
-                            "borderRadius": "50%",
-                            "border": "3px solid orange" if is_current else "2px solid #aaa",
-                            "margin": "5px auto",
-                            "cursor": "pointer",
-                            "background": "white",
-                            "display": "block"
-                        },
-                        id={'type': 'evo_img', 'index': int(evo["id"])}
-                    ),
-                    html.Div(
-                        evo["name"].capitalize(), 
-                        style={
-                            "textAlign": "center",
-                            "fontSize": "14px",
-                            "fontWeight": "bold" if is_current else "normal",
-                            "marginBottom": "10px"
-                        }
-                    )
-                ])
-                stage_nodes.append(node)
+        for i, stage in enumerate(stages):
+            stage_nodes = [
+                create_evolution_node(p, True) if evo_id == pokemon_id else node
+                for evo_id, node in stage
+            ]
             
             tree.append(html.Div(
                 stage_nodes,
@@ -131,7 +561,7 @@ def create_evolution_tree(pokemon_id, df):
                 }
             ))
             
-            if stage != max(stages):
+            if i != len(stages) - 1:
                 tree.append(html.Div(
                     style={
                         'width': '2px',
@@ -158,7 +588,7 @@ def create_evolution_tree(pokemon_id, df):
         return None
 
         import plotly.graph_objects as go
-def create_stat_variability_histogram(df):
+def create_stat_variability_histogram():
     from dash import dcc, html
 
     stat_options = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
@@ -248,21 +678,51 @@ def create_stat_bars(p1, p2):
     
     return dcc.Graph(figure=fig, style={'height': '350px'})
 
-def create_happiness_scatter(df):
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(
-        x=df['hatch_counter'],
-        y=df['base_happiness'],
+def happiness_density_trace(points):
+    # Density cells from clean_data1.scatter_points (large datasets): one WebGL
+    # marker per cell, sized and coloured by how many Pokémon it stands for.
+    counts = np.asarray(points['count'])
+    if 'name' in points:
+        text = points['name']
+        hover = "%{marker.color} Pokémon, e.g. <b>%{text}</b>"
+    else:
+        text = None
+        hover = "%{marker.color} Pokémon around"
+    return go.Scattergl(
+        x=points['hatch_counter'],
+        y=points['base_happiness'],
         mode='markers',
-        text=df['name'],
+        text=text,
         marker=dict(
-            size=10,
-            color='rgba(30,144,255,0.6)',
+            size=(6 + 24 * np.sqrt(counts / max(counts.max(initial=0), 1))).round(1),
+            color=counts,
+            colorscale='Blues',
+            showscale=True,
+            colorbar=dict(title='Pokémon'),
             line=dict(width=1, color='darkblue')
         ),
-        hovertemplate="<b>%{text}</b><br>Hatch Counter: %{x}<br>Happiness: %{y}<extra></extra>"
-    ))
+        hovertemplate=hover + "<br>Hatch Counter: %{x}<br>Happiness: %{y}<extra></extra>"
+    )
+
+def happiness_scatter_figure(aggregates):
+    points = aggregates['happiness']
+    fig = go.Figure()
+
+    if 'count' in points:
+        fig.add_trace(happiness_density_trace(points))
+    else:
+        fig.add_trace(go.Scatter(
+            x=points['hatch_counter'],
+            y=points['base_happiness'],
+            mode='markers',
+            text=points['name'],
+            marker=dict(
+                size=10,
+                color='rgba(30,144,255,0.6)',
+                line=dict(width=1, color='darkblue')
+            ),
+            hovertemplate="<b>%{text}</b><br>Hatch Counter: %{x}<br>Happiness: %{y}<extra></extra>"
+        ))
 
     fig.update_layout(
         title='Base Happiness vs Hatch Counter',
@@ -272,15 +732,51 @@ def create_happiness_scatter(df):
         margin=dict(l=40, r=40, t=40, b=40)
     )
 
+    return fig
+
+def cached_happiness_scatter(data):
+    return data.figures.get(data.version, 'happiness_scatter', lambda: happiness_scatter_figure(data.aggregates))
+
+def create_happiness_scatter(data):
+    fig = cached_happiness_scatter(data)
     return dcc.Graph(figure=fig, style={'width': '100%', 'maxWidth': '600px', 'margin': '0 auto'})
 
+def type_donut_figure(aggregates):
+    type_counts = aggregates['type_counts']
+    return {
+        'data': [go.Pie(
+            labels=[label.capitalize() for label in type_counts['labels']],
+            values=type_counts['counts'],
+            hole=0.4,
+            marker=dict(line=dict(color='white', width=2)),
+            textinfo='none', 
+            hoverinfo='label+percent'
+        )],
+        'layout': go.Layout(
+            title="Primary Type Distribution",
+            showlegend=True,
+            legend=dict(
+                orientation="v",
+                x=1,
+                y=0.5,
+                xanchor='left',
+                yanchor='middle'
+            ),
+            margin=dict(l=20, r=100, t=40, b=20),
+            height=500
+        )
+    }
+
+def cached_type_donut(data):
+    return data.figures.get(data.version, 'type_donut', lambda: type_donut_figure(data.aggregates))
 
-def create_comparison_view(pokemon1_id, pokemon2_id, df):
+
+def create_comparison_view(data, pokemon1_id, pokemon2_id):
     if pokemon1_id is None or pokemon2_id is None:
         return html.Div("Select two Pokémon to compare", style={'textAlign': 'center', 'padding': '20px'})
     
-    p1 = df[df["id"] == pokemon1_id].iloc[0]
-    p2 = df[df["id"] == pokemon2_id].iloc[0]
+    p1 = data.store[pokemon1_id]
+    p2 = data.store[pokemon2_id]
     
     base_size = 200 
     if p1['height'] >= p2['height']:
@@ -344,7 +840,7 @@ def create_comparison_view(pokemon1_id, pokemon2_id, df):
                 html.Div([
                     html.Div([
                         html.Img(
-                            src=p1["sprite_url"],
+                            src=sprite_src(p1, 200),
                             style={
                                 'height': f'{size1}px',
                                 'width': f'{size1}px',
@@ -369,7 +865,7 @@ def create_comparison_view(pokemon1_id, pokemon2_id, df):
                     
                     html.Div([
                         html.Img(
-                            src=p2["sprite_url"],
+                            src=sprite_src(p2, 200),
                             style={
                                 'height': f'{size2}px',
                                 'width': f'{size2}px',
@@ -404,144 +900,365 @@ def create_comparison_view(pokemon1_id, pokemon2_id, df):
         ], style={'backgroundColor': 'white', 'borderRadius': '10px', 'boxShadow': '0 2px 10px rgba(0,0,0,0.1)'})
     ])
 
-app.layout = html.Div(
-
-
-    style={
-        'backgroundColor': '#f9f9f9',
-        'minHeight': '100vh',
-        'padding': '20px',
-        'fontFamily': 'Arial, sans-serif'
-    },
-    children=[
-        dcc.Store(id='comparison_store', data={'pokemon1': None, 'pokemon2': None}),
-        dcc.Store(id='selected_pokemon_id', data=None), 
-        html.H1(
-            "Pokémon Dashboard",
-            style={
-                'textAlign': 'center',
-                'color': '#333',
-                'marginBottom': '30px'
-            }
-        ),
+def serve_layout():
+    # Built per page load, so a reloaded Dataset is reflected on the next visit.
+    data = dataset
+    return html.Div(
+
+
+        style={
+            'backgroundColor': '#f9f9f9',
+            'minHeight': '100vh',
+            'padding': '20px',
+            'fontFamily': 'Arial, sans-serif'
+        },
+        children=[
+            dcc.Store(id='comparison_store', data={'pokemon1': None, 'pokemon2': None}),
+            dcc.Store(id='selected_pokemon_id', data=None), 
+            dcc.Store(id='clicked_image', data=None),
+            dcc.Store(id='displayed_view', data=None),
+            dcc.Store(id='comparison_names', data={}),
+            html.H1(
+                "Pokémon Dashboard",
+                style={
+                    'textAlign': 'center',
+                    'color': '#333',
+                    'marginBottom': '30px'
+                }
+            ),
         
-        html.Div(id='comparison_indicator', style={
-            'position': 'fixed',
-            'top': '20px',
-            'right': '20px',
-            'backgroundColor': 'white',
-            'padding': '10px',
-            'borderRadius': '5px',
-            'boxShadow': '0 2px 5px rgba(0,0,0,0.2)',
-            'zIndex': 1000
-        }),
+            html.Div(id='comparison_indicator', style={
+                'position': 'fixed',
+                'top': '20px',
+                'right': '20px',
+                'backgroundColor': 'white',
+                'padding': '10px',
+                'borderRadius': '5px',
+                'boxShadow': '0 2px 5px rgba(0,0,0,0.2)',
+                'zIndex': 1000
+            }),
         
-        html.Div(
-    id='dropdown_container',
-    children=[
-        html.Label(
-            "Select Pokémon:",
-            style={
-                'display': 'block',
-                'marginBottom': '10px',
-                'fontWeight': 'bold'
-            }
-        ),
-        dcc.Dropdown(
-            id='pokemon_dropdown',
-            options=pokemon_options,
-            value=None,
-            disabled=df.empty,
-            style={
-                'width': '100%',
-                'maxWidth': '400px',
-                'margin': '0 auto'
-            }
-        )
-    ],
-    style={
-        'width': '100%',
-        'maxWidth': '800px',
-        'margin': '0 auto 30px',
-        'display': 'none' 
-    }
-),
+            html.Div(
+        id='dropdown_container',
+        children=[
+            html.Label(
+                "Select Pokémon:",
+                style={
+                    'display': 'block',
+                    'marginBottom': '10px',
+                    'fontWeight': 'bold'
+                }
+            ),
+            dcc.Dropdown(
+                id='pokemon_dropdown',
+                options=pokemon_options(data, "") if data.store else [],
+                value=None,
+                disabled=not data.store,
+                style={
+                    'width': '100%',
+                    'maxWidth': '400px',
+                    'margin': '0 auto'
+                }
+            )
+        ],
+        style={
+            'width': '100%',
+            'maxWidth': '800px',
+            'margin': '0 auto 30px',
+            'display': 'none' 
+        }
+    ),
 
         
-        html.Div(
-            id='pokemon_content',
-            style={
-                'maxWidth': '1200px',
-                'margin': '0 auto',
-                'backgroundColor': 'white',
-                'borderRadius': '10px',
-                'boxShadow': '0 2px 10px rgba(0,0,0,0.1)',
-                'padding': '20px',
-                'minHeight': '500px'
-            }
-        )
-    ]
-)
+            html.Div(
+                id='pokemon_content',
+                style={
+                    'maxWidth': '1200px',
+                    'margin': '0 auto',
+                    'backgroundColor': 'white',
+                    'borderRadius': '10px',
+                    'boxShadow': '0 2px 10px rgba(0,0,0,0.1)',
+                    'padding': '20px',
+                    'minHeight': '500px'
+                }
+            )
+        ]
+    )
 
+app.layout = serve_layout
 
 
-@app.callback(
+
+# UI-only callbacks run in the browser: they only rearrange data the page
+# already has, so they cost no round trip or worker slot.
+app.clientside_callback(
+    """
+    function(selectedId) {
+        if (selectedId === null || selectedId === undefined) {
+            return {display: 'none'};
+        }
+        return {width: '100%', maxWidth: '800px', margin: '0 auto 30px', display: 'block'};
+    }
+    """,
     Output('dropdown_container', 'style'),
-    [Input('selected_pokemon_id', 'data')],
+    Input('selected_pokemon_id', 'data')
 )
-def toggle_dropdown_visibility(selected_id):
-    if selected_id is None:
-        return {'display': 'none'}
-    return {
-        'width': '100%',
-        'maxWidth': '800px',
-        'margin': '0 auto 30px',
-        'display': 'block'
-    }
 
+app.clientside_callback(
+    """
+    function(comparison, names) {
+        const colors = ['#FFA500', '#1E90FF'];
+        const selected = [comparison.pokemon1, comparison.pokemon2]
+            .map((id, i) => id && names[id] ? {
+                type: 'Span',
+                namespace: 'dash_html_components',
+                props: {
+                    children: names[id].charAt(0).toUpperCase() + names[id].slice(1).toLowerCase(),
+                    style: {color: colors[i], fontWeight: 'bold'}
+                }
+            } : null)
+            .filter(Boolean);
+        const span = text => ({type: 'Span', namespace: 'dash_html_components', props: {children: text}});
 
-@app.callback(
+        if (selected.length === 1) {
+            return [span('Selected for comparison: '), selected[0]];
+        }
+        if (selected.length === 2) {
+            return [span('Comparing: '), selected[0], span(' vs '), selected[1]];
+        }
+        return 'No Pokémon selected for comparison';
+    }
+    """,
     Output('comparison_indicator', 'children'),
-    [Input('comparison_store', 'data')]
+    [Input('comparison_store', 'data'),
+     Input('comparison_names', 'data')]
 )
-def update_comparison_indicator(comparison_data):
-    if comparison_data['pokemon1'] is None and comparison_data['pokemon2'] is None:
-        return "No Pokémon selected for comparison"
+
+def comparison_border(in_comparison):
+    return '3px solid #FFA500' if in_comparison else '3px solid transparent'
+
+def create_detail_view(data, pokemon_id, in_comparison):
+    p = data.store[pokemon_id]
+
+    # The donut, happiness scatter and stat histogram don't depend on the
+    # selected Pokémon; after the first request they come from data.figures.
+    start, builds = perf_counter(), data.figures.builds
+    type_donut = dcc.Graph(
+        id='type_donut',
+        figure=cached_type_donut(data),
+        config={'displayModeBar': False}
+    )
+    happiness_scatter = create_happiness_scatter(data)
+    dash.callback_context.record_timing(
+        'global_figures', perf_counter() - start,
+        f"{data.figures.builds - builds} built" if data.figures.builds != builds else "cached"
+    )
+
     
-    selected = []
-    if comparison_data['pokemon1']:
-        name1 = df[df['id'] == comparison_data['pokemon1']].iloc[0]['name'].capitalize()
-        selected.append(html.Span(name1, style={'color': '#FFA500', 'fontWeight': 'bold'}))
-    if comparison_data['pokemon2']:
-        name2 = df[df['id'] == comparison_data['pokemon2']].iloc[0]['name'].capitalize()
-        selected.append(html.Span(name2, style={'color': '#1E90FF', 'fontWeight': 'bold'}))
+    stats = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+    stat_values = [int(p[s]) for s in stats]
+    stats += [stats[0]] 
+    stat_values += [stat_values[0]]
     
-    if len(selected) == 1:
-        return [html.Span("Selected for comparison: "), selected[0]]
-    elif len(selected) == 2:
-        return [html.Span("Comparing: "), selected[0], html.Span(" vs "), selected[1]]
-    else:
-        return "No Pokémon selected for comparison"
+    radar = go.Figure()
+    radar.add_trace(go.Scatterpolar(
+        r=stat_values,
+        theta=[s.upper() for s in stats],
+        fill='toself',
+        line=dict(color='#FFA500'),
+        fillcolor='rgba(255, 165, 0, 0.4)'
+    ))
+    radar.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, max(stat_values[:-1]) + 20]
+            )
+        ),
+        showlegend=False,
+        margin=dict(l=40, r=40, t=40, b=40),
+        height=350
+    )
+
+    
+    evolution_tree = create_evolution_tree(data, pokemon_id)
+
+    gender_labels, gender_values = gender_slices(p)
+    colors = ['#3498db', '#e74c3c', '#95a5a6']
+
+    gender_pie = dcc.Graph(
+id='gender_pie',
+figure={
+    'data': [{
+        'type': 'pie',
+        'labels': gender_labels,
+        'values': gender_values,
+        'hoverinfo': 'label+percent',
+        'textinfo': 'label+percent',
+        'marker': {
+            'colors': colors[:len(gender_labels)],
+            'line': {'color': 'white', 'width': 2}
+        }
+    }],
+    'layout': {
+        'title': 'Gender Distribution',
+        'paper_bgcolor': '#f9f9f9',
+        'plot_bgcolor': '#f9f9f9',
+        'margin': {'l': 20, 'r': 20, 't': 30, 'b': 20},
+        'hovermode': 'closest'
+    }
+},
+style={'width': '300px', 'margin': '20px auto'}
+)
+
+
+    capture_difficulty_gauge = create_capture_difficulty_gauge(p)
+
+    return html.Div(
+        [
+            html.Div(
+                [
+                    html.Div(
+[
+    html.Div(
+        [
+            html.H2(
+                p["name"].capitalize(),
+                style={'color': '#333', 'marginBottom': '10px'}
+            ),
+            html.Img(
+                src=sprite_src(p, 200),
+                style={
+                    'height': '200px',
+                    'width': '200px',
+                    'marginBottom': '20px',
+                    'cursor': 'pointer',
+                    'border': comparison_border(in_comparison),
+                    'transition': 'border 0.3s ease'
+                },
+                id={'type': 'pokemon_img', 'index': int(p["id"])}
+            ),
+            html.P(f"Height: {p['height']} dm | Weight: {p['weight']} hg", style={'marginBottom': '10px'}),
+            html.P(f"Abilities: {p['abilities']}", style={'marginBottom': '10px'}),
+            html.P(f"Type: {p['type_1'].capitalize()}" + (f" / {p['type_2'].capitalize()}" if p['type_2'] is not None else ""), style={'marginBottom': '20px'}),
+            dcc.Graph(figure=radar, style={'height': '350px'})
+        ],
+        style={'flex': '1', 'padding': '20px', 'minWidth': '320px'}
+    ),
+
+    html.Div(
+        [
+            html.H3("Evolution Chain", style={
+                'borderBottom': '2px solid #eee',
+                'paddingBottom': '10px',
+                'marginBottom': '20px'
+            }),
+            evolution_tree if evolution_tree else html.Div(
+                "No evolution data available",
+                style={'textAlign': 'center', 'color': '#999', 'padding': '40px'}
+            )
+        ],
+        style={'flex': '1', 'padding': '10px', 'minWidth': '220px', 'maxWidth': '250px'}
+    ),
+
+    html.Div(
+        [
+            html.Div(capture_difficulty_gauge, style={'marginBottom': '20px'}),
+            html.Div(happiness_scatter)
+        ],
+        style={'flex': '1', 'padding': '10px', 'minWidth': '320px'}
+    )
+],
+style={
+    'display': 'flex',
+    'flexWrap': 'wrap',
+    'justifyContent': 'center'
+}
+),
+
+                ],
+                style={
+                    'display': 'flex',
+                    'flexWrap': 'wrap'
+                }
+            ),
+            html.Hr(style={'margin': '40px 0', 'borderTop': '2px solid #ccc'}),
+
+
+            html.Div(
+                [
+                    html.Div(
+                        gender_pie,
+                        style={'flex': '1', 'padding': '10px', 'minWidth': '300px'}
+                    ),
+                    html.Div(
+                        [
+                            type_donut,
+                            html.Div(id='type_sprites', style={
+                                'display': 'flex',
+                                'flexWrap': 'wrap',
+                                'justifyContent': 'center',
+                                'gap': '10px',
+                                'marginTop': '10px',
+                                'maxWidth': '450px'
+                            })
+                        ],
+                        style={
+                            'flex': '1',
+                            'padding': '10px',
+                            'minWidth': '400px',
+                            'maxWidth': '500px'
+                        }
+                    ),
+                    html.Div(
+                        create_stat_variability_histogram(),
+                        style={'flex': '1', 'padding': '10px', 'minWidth': '300px'}
+                    )
+                ],
+                style={
+                    'display': 'flex',
+                    'flexWrap': 'wrap',
+                    'justifyContent': 'center'
+                }
+            )
+
+        ]
+    )
+
 
 @app.callback(
-    Output('pokemon_content', 'children'),
+    [Output('pokemon_content', 'children'),
+     Output('displayed_view', 'data')],
     [Input('pokemon_dropdown', 'value'),
      Input('comparison_store', 'data'),
      Input('selected_pokemon_id', 'data')],
+    State('displayed_view', 'data'),
     prevent_initial_call=False
 )
-def update_display(pokemon_id, comparison_data, selected_id):
+def update_display(pokemon_id, comparison_data, selected_id, displayed_view):
     if pokemon_id is None and selected_id is not None:
         pokemon_id = selected_id
 
+    data = dataset
+
     ctx = dash.callback_context
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
     
     if triggered_id == 'comparison_store' and comparison_data['pokemon1'] and comparison_data['pokemon2']:
-        return create_comparison_view(comparison_data['pokemon1'], comparison_data['pokemon2'], df)
-    
+        pair = (comparison_data['pokemon1'], comparison_data['pokemon2'])
+        content = payload_cache.get((data.version, 'comparison', pair), lambda: create_comparison_view(data, *pair))
+        return content, {'view': 'comparison'}
+
+    # A comparison change that leaves the same single view on screen only
+    # moves the sprite border, which update_comparison_border patches.
+    view = {'view': 'single', 'id': pokemon_id}
+    if triggered_id == 'comparison_store' and displayed_view == view:
+        raise dash.exceptions.PreventUpdate
+    return render_single_view(data, pokemon_id, comparison_data), view
+
+def render_single_view(data, pokemon_id, comparison_data):
     try:
-        if df.empty:
+        if not data.store:
             return html.Div(
                 "Pokémon data could not be loaded. Please check your data files.",
                 style={
@@ -551,229 +1268,14 @@ def update_display(pokemon_id, comparison_data, selected_id):
                 }
             )
             
-        if pokemon_id is None or pokemon_id not in df['id'].values:
-            return create_gallery_view(df)
+        if pokemon_id is None or pokemon_id not in data.store:
+            return create_gallery_view(data)
             
-        p = df[df["id"] == pokemon_id].iloc[0]
-
-        type_counts = df['type_1'].value_counts().sort_values(ascending=False)
-
-        type_donut = dcc.Graph(
-            id='type_donut',
-            figure={
-                'data': [go.Pie(
-                    labels=type_counts.index.str.capitalize(),
-                    values=type_counts.values,
-                    hole=0.4,
-                    marker=dict(line=dict(color='white', width=2)),
-                    textinfo='none', 
-                    hoverinfo='label+percent'
-                )],
-                'layout': go.Layout(
-                    title="Primary Type Distribution",
-                    showlegend=True,
-                    legend=dict(
-                        orientation="v",
-                        x=1,
-                        y=0.5,
-                        xanchor='left',
-                        yanchor='middle'
-                    ),
-                    margin=dict(l=20, r=100, t=40, b=20),
-                    height=500
-                )
-            },
-            config={'displayModeBar': False}
-        )
-
-        
-        stats = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
-        stat_values = [int(p[s]) for s in stats]
-        stats += [stats[0]] 
-        stat_values += [stat_values[0]]
-        
-        radar = go.Figure()
-        radar.add_trace(go.Scatterpolar(
-            r=stat_values,
-            theta=[s.upper() for s in stats],
-            fill='toself',
-            line=dict(color='#FFA500'),
-            fillcolor='rgba(255, 165, 0, 0.4)'
-        ))
-        radar.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, max(stat_values[:-1]) + 20]
-                )
-            ),
-            showlegend=False,
-            margin=dict(l=40, r=40, t=40, b=40),
-            height=350
-        )
-
-        
-        evolution_tree = create_evolution_tree(pokemon_id, df)
-
-        gender_dist = p.get("gender_distribution", "Genderless")
-        gender_labels = []
-        gender_values = []
-        colors = ['#3498db', '#e74c3c', '#95a5a6']
-
-        if "Male" in gender_dist and "Female" in gender_dist:
-            male_pct = int(gender_dist.split('%')[0])
-            female_pct = 100 - male_pct
-            gender_labels = ['Male', 'Female']
-            gender_values = [male_pct, female_pct]
-        elif "Male" in gender_dist:
-            gender_labels = ['Male']
-            gender_values = [100]
-        elif "Female" in gender_dist:
-            gender_labels = ['Female']
-            gender_values = [100]
-        else:
-            gender_labels = ['Genderless']
-            gender_values = [100]
-
-        gender_pie = dcc.Graph(
-    id='gender_pie',
-    figure={
-        'data': [{
-            'type': 'pie',
-            'labels': gender_labels,
-            'values': gender_values,
-            'hoverinfo': 'label+percent',
-            'textinfo': 'label+percent',
-            'marker': {
-                'colors': colors[:len(gender_labels)],
-                'line': {'color': 'white', 'width': 2}
-            }
-        }],
-        'layout': {
-            'title': 'Gender Distribution',
-            'paper_bgcolor': '#f9f9f9',
-            'plot_bgcolor': '#f9f9f9',
-            'margin': {'l': 20, 'r': 20, 't': 30, 'b': 20},
-            'hovermode': 'closest'
-        }
-    },
-    style={'width': '300px', 'margin': '20px auto'}
-)
-
-
-        capture_difficulty_gauge = create_capture_difficulty_gauge(p)
-
-        return html.Div(
-            [
-                html.Div(
-                    [
-                        html.Div(
-    [
-        html.Div(
-            [
-                html.H2(
-                    p["name"].capitalize(),
-                    style={'color': '#333', 'marginBottom': '10px'}
-                ),
-                html.Img(
-                    src=p["sprite_url"],
-                    style={
-                        'height': '200px',
-                        'width': '200px',
-                        'marginBottom': '20px',
-                        'cursor': 'pointer',
-                        'border': '3px solid #FFA500' if comparison_data['pokemon1'] == pokemon_id or comparison_data['pokemon2'] == pokemon_id else '3px solid transparent',
-                        'transition': 'border 0.3s ease'
-                    },
-                    id={'type': 'pokemon_img', 'index': int(p["id"])}
-                ),
-                html.P(f"Height: {p['height']} dm | Weight: {p['weight']} hg", style={'marginBottom': '10px'}),
-                html.P(f"Abilities: {p['abilities']}", style={'marginBottom': '10px'}),
-                html.P(f"Type: {p['type_1'].capitalize()}" + (f" / {p['type_2'].capitalize()}" if pd.notna(p['type_2']) else ""), style={'marginBottom': '20px'}),
-                dcc.Graph(figure=radar, style={'height': '350px'})
-            ],
-            style={'flex': '1', 'padding': '20px', 'minWidth': '320px'}
-        ),
-
-        html.Div(
-            [
-                html.H3("Evolution Chain", style={
-                    'borderBottom': '2px solid #eee',
-                    'paddingBottom': '10px',
-                    'marginBottom': '20px'
-                }),
-                evolution_tree if evolution_tree else html.Div(
-                    "No evolution data available",
-                    style={'textAlign': 'center', 'color': '#999', 'padding': '40px'}
-                )
-            ],
-            style={'flex': '1', 'padding': '10px', 'minWidth': '220px', 'maxWidth': '250px'}
-        ),
-
-        html.Div(
-            [
-                html.Div(capture_difficulty_gauge, style={'marginBottom': '20px'}),
-                html.Div(create_happiness_scatter(df))
-            ],
-            style={'flex': '1', 'padding': '10px', 'minWidth': '320px'}
-        )
-    ],
-    style={
-        'display': 'flex',
-        'flexWrap': 'wrap',
-        'justifyContent': 'center'
-    }
-),
-
-                    ],
-                    style={
-                        'display': 'flex',
-                        'flexWrap': 'wrap'
-                    }
-                ),
-                html.Hr(style={'margin': '40px 0', 'borderTop': '2px solid #ccc'}),
-
-
-                html.Div(
-                    [
-                        html.Div(
-                            gender_pie,
-                            style={'flex': '1', 'padding': '10px', 'minWidth': '300px'}
-                        ),
-                        html.Div(
-                            [
-                                type_donut,
-                                html.Div(id='type_sprites', style={
-                                    'display': 'flex',
-                                    'flexWrap': 'wrap',
-                                    'justifyContent': 'center',
-                                    'gap': '10px',
-                                    'marginTop': '10px',
-                                    'maxWidth': '450px'
-                                })
-                            ],
-                            style={
-                                'flex': '1',
-                                'padding': '10px',
-                                'minWidth': '400px',
-                                'maxWidth': '500px'
-                            }
-                        ),
-                        html.Div(
-                            create_stat_variability_histogram(df),
-                            style={'flex': '1', 'padding': '10px', 'minWidth': '300px'}
-                        )
-                    ],
-                    style={
-                        'display': 'flex',
-                        'flexWrap': 'wrap',
-                        'justifyContent': 'center'
-                    }
-                )
-
-            ]
-        )
-
+        # The detail view depends only on the id and on whether it is selected
+        # for comparison, so the whole serialized view is cached.
+        in_comparison = pokemon_id in (comparison_data['pokemon1'], comparison_data['pokemon2'])
+        return payload_cache.get((data.version, 'detail', pokemon_id, in_comparison),
+                                 lambda: create_detail_view(data, pokemon_id, in_comparison))
         
     except Exception as e:
         print(f"Error in update_display: {e}")
@@ -788,86 +1290,127 @@ def update_display(pokemon_id, comparison_data, selected_id):
             }
         )
 
-@app.callback(
-    Output('pokemon_dropdown', 'value'),
-    [Input({'type': 'evo_img', 'index': dash.ALL}, 'n_clicks')],
-    [State({'type': 'evo_img', 'index': dash.ALL}, 'id')],
+# Clicks on gallery, evolution and detail images are resolved in the browser
+# from the triggered id, so only the clicked element's type and index are
+# sent to the server instead of the n_clicks and id lists of every image.
+app.clientside_callback(
+    """
+    function() {
+        const triggered = window.dash_clientside.callback_context.triggered;
+        const clicked = triggered.find(t => t.value);
+        if (!clicked) {
+            throw window.dash_clientside.PreventUpdate;
+        }
+        const id = JSON.parse(clicked.prop_id.slice(0, clicked.prop_id.lastIndexOf('.')));
+        return {type: id.type, index: id.index, n_clicks: clicked.value};
+    }
+    """,
+    Output('clicked_image', 'data'),
+    [Input({'type': 'gallery_img', 'index': dash.ALL}, 'n_clicks'),
+     Input({'type': 'evo_img', 'index': dash.ALL}, 'n_clicks'),
+     Input({'type': 'pokemon_img', 'index': dash.ALL}, 'n_clicks')],
     prevent_initial_call=True
 )
-def change_pokemon(n_clicks_list, ids):
-    if not n_clicks_list or all(click is None for click in n_clicks_list):
-        raise dash.exceptions.PreventUpdate
-        
-    try:
-        valid_clicks = [(i, click) for i, click in enumerate(n_clicks_list) if click is not None]
-        if not valid_clicks:
-            raise dash.exceptions.PreventUpdate
-            
-        clicked_index = max(valid_clicks, key=lambda x: x[1])[0]
-        return ids[clicked_index]['index']
-    except:
-        raise dash.exceptions.PreventUpdate
 
 @app.callback(
-    Output('comparison_store', 'data'),
-    [Input({'type': 'pokemon_img', 'index': dash.ALL}, 'n_clicks')],
-    [State({'type': 'pokemon_img', 'index': dash.ALL}, 'id'),
-     State('comparison_store', 'data')],
+    [Output('selected_pokemon_id', 'data'),
+     Output('pokemon_dropdown', 'value'),
+     Output('comparison_store', 'data'),
+     Output('comparison_names', 'data')],
+    Input('clicked_image', 'data'),
+    State('comparison_store', 'data'),
     prevent_initial_call=True
 )
-
-
-
-def add_to_comparison(n_clicks_list, ids, current_data):
-    if not n_clicks_list or all(click is None for click in n_clicks_list):
+def route_image_click(clicked, current_data):
+    if not clicked:
         raise dash.exceptions.PreventUpdate
+
+    clicked_id = clicked['index']
+    if clicked['type'] == 'gallery_img':
+        return clicked_id, dash.no_update, dash.no_update, dash.no_update
+    if clicked['type'] == 'evo_img':
+        return dash.no_update, clicked_id, dash.no_update, dash.no_update
+    if clicked['type'] == 'pokemon_img':
+        data = dataset
+        comparison = add_to_comparison(clicked_id, current_data)
+        # Only the names the comparison indicator shows are sent to the browser.
+        names = {str(i): data.store[i]['name'] for i in (comparison['pokemon1'], comparison['pokemon2'])
+                 if i is not None and i in data.store}
+        return dash.no_update, dash.no_update, comparison, names
+    raise dash.exceptions.PreventUpdate
+
+def add_to_comparison(clicked_id, current_data):
+    if current_data['pokemon1'] is None:
+        current_data['pokemon1'] = clicked_id
+    elif current_data['pokemon2'] is None and clicked_id != current_data['pokemon1']:
+        current_data['pokemon2'] = clicked_id
+    else:
+        current_data = {'pokemon1': clicked_id, 'pokemon2': None}
         
-    try:
-        valid_clicks = [(i, click) for i, click in enumerate(n_clicks_list) if click is not None]
-        if not valid_clicks:
-            raise dash.exceptions.PreventUpdate
-            
-        clicked_index = max(valid_clicks, key=lambda x: x[1])[0]
-        clicked_id = ids[clicked_index]['index']
-        
-        if current_data['pokemon1'] is None:
-            current_data['pokemon1'] = clicked_id
-        elif current_data['pokemon2'] is None and clicked_id != current_data['pokemon1']:
-            current_data['pokemon2'] = clicked_id
-        else:
-            current_data = {'pokemon1': clicked_id, 'pokemon2': None}
-            
-        return current_data
-    except:
-        raise dash.exceptions.PreventUpdate
+    return current_data
 
 @app.callback(
+    Output({'type': 'pokemon_img', 'index': dash.ALL}, 'style'),
+    Input('comparison_store', 'data'),
+    prevent_initial_call=True
+)
+def update_comparison_border(comparison_data):
+    selected = (comparison_data['pokemon1'], comparison_data['pokemon2'])
+    patches = []
+    for output in dash.callback_context.outputs_list:
+        patch = dash.Patch()
+        patch['border'] = comparison_border(output['id']['index'] in selected)
+        patches.append(patch)
+    return patches
+
+app.clientside_callback(
+    """
+    function(nClicks) {
+        if (nClicks === null || nClicks === undefined) {
+            throw window.dash_clientside.PreventUpdate;
+        }
+        return {pokemon1: null, pokemon2: null};
+    }
+    """,
     Output('comparison_store', 'data', allow_duplicate=True),
-    [Input('back_button', 'n_clicks')],
+    Input('back_button', 'n_clicks'),
     prevent_initial_call=True
 )
-def back_to_single_view(n_clicks):
-    if n_clicks is None:
-        raise dash.exceptions.PreventUpdate
-        
-    return {'pokemon1': None, 'pokemon2': None}
 
 @app.callback(
-    Output('selected_pokemon_id', 'data'),
-    Input({'type': 'gallery_img', 'index': dash.ALL}, 'n_clicks'),
-    State({'type': 'gallery_img', 'index': dash.ALL}, 'id'),
+    [Output('gallery_cards', 'children'),
+     Output('gallery_page', 'data'),
+     Output('gallery_page_label', 'children'),
+     Output('gallery_prev', 'disabled'),
+     Output('gallery_next', 'disabled')],
+    [Input('gallery_search', 'value'),
+     Input('gallery_type', 'value'),
+     Input('gallery_prev', 'n_clicks'),
+     Input('gallery_next', 'n_clicks')],
+    State('gallery_page', 'data'),
     prevent_initial_call=True
 )
-def handle_gallery_click(n_clicks_list, ids):
-    if not n_clicks_list or all(n is None for n in n_clicks_list):
-        raise dash.exceptions.PreventUpdate
+def update_gallery(search, type_filter, prev_clicks, next_clicks, page):
+    triggered_id = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+    if triggered_id == 'gallery_prev':
+        page -= 1
+    elif triggered_id == 'gallery_next':
+        page += 1
+    else:
+        page = 0
 
-    clicked_index = max(
-        [(i, n) for i, n in enumerate(n_clicks_list) if n is not None],
-        key=lambda x: x[1]
-    )[0]
-    return ids[clicked_index]['index']
+    cards, page, pages, matches = gallery_page(dataset, search, type_filter, page)
+    return cards, page, gallery_page_label(page, pages, matches), page == 0, page >= pages - 1
 
+# Options are searched on the server, so the page never carries the whole list.
+@app.callback(
+    Output('pokemon_dropdown', 'options'),
+    [Input('pokemon_dropdown', 'search_value'),
+     Input('pokemon_dropdown', 'value')],
+    prevent_initial_call=True
+)
+def update_pokemon_options(search, value):
+    return pokemon_options(dataset, search, value)
 
 @app.callback(
 Output('gender_pie', 'figure'),
@@ -875,34 +1418,17 @@ Input('pokemon_dropdown', 'value')
 )
 
 def update_gender_pie(pokemon_id):
-    if pokemon_id is None or df.empty:
+    data = dataset
+    if pokemon_id is None or not data.store:
         return go.Figure()
 
-    p = df[df["id"] == pokemon_id].iloc[0]
-    gender_dist = p.get("gender_distribution", "Genderless")
+    return payload_cache.get((data.version, 'gender_pie', pokemon_id), lambda: gender_pie_figure(data, pokemon_id))
 
-    gender_labels = []
-    gender_values = []
+def gender_pie_figure(data, pokemon_id):
+    p = data.store[pokemon_id]
+    gender_labels, gender_values = gender_slices(p)
     colors = ['#3498db', '#e74c3c', '#95a5a6'] 
 
-    if "Male" in gender_dist and "Female" in gender_dist:
-        try:
-            male_pct = int(gender_dist.split('%')[0])
-            female_pct = 100 - male_pct
-        except:
-            male_pct = female_pct = 50
-        gender_labels = ['Male', 'Female']
-        gender_values = [male_pct, female_pct]
-    elif "Male" in gender_dist:
-        gender_labels = ['Male']
-        gender_values = [100]
-    elif "Female" in gender_dist:
-        gender_labels = ['Female']
-        gender_values = [100]
-    else:
-        gender_labels = ['Genderless']
-        gender_values = [100]
-
     fig = go.Figure(data=[go.Pie(
         labels=gender_labels,
         values=gender_values,
@@ -929,26 +1455,51 @@ def update_gender_pie(pokemon_id):
     Input('stat_dropdown', 'value')
 )
 def update_stat_histogram(selected_stat):
-    if selected_stat is None or df.empty:
+    data = dataset
+    if selected_stat is None or not data.store:
         return go.Figure()
 
-    fig = go.Figure(data=[go.Histogram(
-        x=df[selected_stat],
-        nbinsx=20,
+    start, builds = perf_counter(), data.figures.builds
+    fig = cached_stat_histogram(data, selected_stat)
+    dash.callback_context.record_timing(
+        'stat_histogram', perf_counter() - start, "built" if data.figures.builds != builds else "cached"
+    )
+    return fig
+
+def cached_stat_histogram(data, selected_stat):
+    return data.figures.get(data.version, ('stat_histogram', selected_stat),
+                            lambda: stat_histogram_figure(data, selected_stat))
+
+def stat_histogram_figure(data, selected_stat):
+    # Bins are counted once by clean_data1.py; the figure only draws them.
+    stat = data.aggregates['stats'][selected_stat]
+    edges = stat['bin_edges']
+    fig = go.Figure(data=[go.Bar(
+        x=[(lo + hi) / 2 for lo, hi in zip(edges, edges[1:])],
+        y=stat['bin_counts'],
+        width=[(hi - lo) * 0.9 for lo, hi in zip(edges, edges[1:])],
+        customdata=list(zip(edges, edges[1:])),
+        hovertemplate="%{customdata[0]:.0f}-%{customdata[1]:.0f}: %{y}<extra></extra>",
         marker_color='lightskyblue',
         opacity=0.75
     )])
+    fig.add_vline(x=stat['percentiles']['50'], line_dash='dash', line_color='gray',
+                  annotation_text='median')
 
     fig.update_layout(
         title=f'Distribution of {selected_stat.replace("-", " ").capitalize()}',
         xaxis_title=selected_stat.replace("-", " ").capitalize(),
         yaxis_title='Count',
-        bargap=0.1,
+        xaxis_range=[stat['min'], stat['max']],
         height=400,
         margin=dict(l=40, r=40, t=40, b=40)
     )
 
     return fig
 
+startup_mark("callbacks")
+
 if __name__ == '__main__':
+    if not STATS_ROUTES:
+        register_stats_routes()
     app.run(debug=True)
\ No newline at end of file
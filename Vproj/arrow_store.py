@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+import pyarrow as pa
+
+
+def file_signature(path):
+    """[size, mtime_ns] of a data file, recorded next to anything derived from it."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def to_numpy(array):
+    """A numpy array of an Arrow (chunked) array, viewing the data buffer when it is numeric and null-free.
+
+    The view is read straight from the buffer because pyarrow's own to_numpy()
+    imports pandas, which the memory-mapped path otherwise never needs.
+    """
+    if isinstance(array, pa.ChunkedArray) and array.num_chunks == 1:
+        array = array.chunk(0)
+    numeric = pa.types.is_integer(array.type) or pa.types.is_floating(array.type)
+    if isinstance(array, pa.Array) and numeric and array.null_count == 0:
+        dtype = np.dtype(array.type.to_pandas_dtype())
+        return np.frombuffer(array.buffers()[1], dtype=dtype, count=len(array), offset=array.offset * dtype.itemsize)
+    return array.to_numpy()
+
+
+class ArrowStore:
+    """Read-only Pokémon table, usually backed by a memory-mapped Arrow IPC file.
+
+    Opening the file maps it instead of reading it, so every worker process
+    shares the same page-cache pages and opening costs the same at any size.
+    A file may hold several record batches (clean_data1.py --stream writes one
+    per chunk); numeric columns are then viewed one batch at a time, and a
+    table of batch start positions maps store positions to them, so no column
+    is ever copied into one array. Lookups go through the id column (binary
+    search, or an argsort when the file is not in id order) and rows are
+    turned into Python dicts only when asked for. They are not kept: a lookup
+    costs the same at any size, and keeping them would slowly turn the shared
+    mapping into private objects in every long-running worker.
+    """
+
+    def __init__(self, table, source=None):
+        self.table = table
+        self.source = source
+        self.views = {}
+        self.id_starts, self.id_chunks = self.chunks("id") if "id" in table.column_names else (np.empty(0), [])
+        ids = self.id_chunks
+        # Ids rising within and across batches: search the batches' first ids, then the one batch.
+        if all(np.all(chunk[1:] > chunk[:-1]) for chunk in ids) and all(a[-1] < b[0] for a, b in zip(ids, ids[1:])):
+            self.order = None
+            self.first_ids = np.array([chunk[0] for chunk in ids])
+        else:
+            all_ids = np.concatenate(ids)
+            self.order = np.argsort(all_ids, kind="stable")
+            self.sorted_ids = all_ids[self.order]
+
+    @classmethod
+    def open(cls, path):
+        return cls(pa.ipc.open_file(pa.memory_map(path, "r")).read_all(), path)
+
+    @classmethod
+    def from_frame(cls, df, source=None):
+        """In-memory store for data that only exists as a DataFrame (CSV/Parquet fallback)."""
+        return cls(pa.Table.from_pandas(df, preserve_index=False), source)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __contains__(self, pokemon_id):
+        return self.position(pokemon_id) is not None
+
+    def __getitem__(self, pokemon_id):
+        pos = self.position(pokemon_id)
+        if pos is None:
+            raise KeyError(pokemon_id)
+        return self.row_at(pos)
+
+    def position(self, pokemon_id):
+        if self.order is not None:
+            i = int(np.searchsorted(self.sorted_ids, pokemon_id))
+            if i == len(self.sorted_ids) or self.sorted_ids[i] != pokemon_id:
+                return None
+            return int(self.order[i])
+        b = int(np.searchsorted(self.first_ids, pokemon_id, side="right")) - 1
+        if b < 0:
+            return None
+        chunk = self.id_chunks[b]
+        i = int(np.searchsorted(chunk, pokemon_id))
+        if i == len(chunk) or chunk[i] != pokemon_id:
+            return None
+        return int(self.id_starts[b]) + i
+
+    def row_at(self, pos):
+        return self.table.slice(pos, 1).to_pylist()[0]
+
+    def chunks(self, name):
+        """Numpy views of a primitive column, one per non-empty batch, with the store position each starts at.
+
+        Each view is zero-copy when its batch has no nulls.
+        """
+        view = self.views.get(name)
+        if view is None:
+            starts, chunks, start = [], [], 0
+            for chunk in self.table.column(name).chunks:
+                if len(chunk):
+                    starts.append(start)
+                    chunks.append(to_numpy(chunk))
+                start += len(chunk)
+            view = self.views[name] = (np.array(starts, dtype=np.int64), chunks)
+        return view
+
+    def take(self, name, positions):
+        """Values of a primitive column at the given store positions, gathered batch by batch."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts, chunks = self.chunks(name)
+        if len(chunks) == 1:
+            return chunks[0][positions]
+        batch = np.searchsorted(starts, positions, side="right") - 1
+        values = np.empty(len(positions), dtype=chunks[0].dtype if chunks else np.int64)
+        for b in np.unique(batch).tolist():
+            selected = batch == b
+            values[selected] = chunks[b][positions[selected] - starts[b]]
+        return values
+
+    def where(self, name, value):
+        """Store positions, in order, where a primitive column equals `value`."""
+        starts, chunks = self.chunks(name)
+        return np.concatenate([np.empty(0, dtype=np.int64)] +
+                              [np.flatnonzero(chunk == value) + start for start, chunk in zip(starts, chunks)])
+
+    def frame(self):
+        """The table as a DataFrame whose columns stay Arrow-backed (no copy of the mapped data)."""
+        import pandas as pd
+
+        df = self.table.to_pandas(types_mapper=pd.ArrowDtype)
+        df.attrs["source"] = self.source
+        return df
@@ -0,0 +1,757 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from http_cache import CACHE_DIR
+
+# Cold start to first response (seconds) that test_regressions.py fails above; override per machine.
+STARTUP_BUDGET_S = float(os.environ.get("STARTUP_BUDGET_S", "3.0"))
+
+
+def _peak_bytes(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def _print_row(label, full_ms, fast_ms, full_peak, fast_peak):
+    print(f"{label:<22}{full_ms:>10.3f}{fast_ms:>10.3f}{full_ms / fast_ms:>8.1f}x"
+          f"{full_peak / 1024:>12.1f}{fast_peak / 1024:>12.1f}")
+
+
+def bench_projection(cache_dir=CACHE_DIR, repeat=5):
+    """Full json.loads vs json_projection.project on the payloads recorded in the HTTP cache."""
+    from fetch_data1 import POKEMON_FIELDS, SPECIES_FIELDS
+    from json_projection import project
+
+    payloads = {"pokemon": [], "species": []}
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(cache_dir, name), encoding="utf-8") as f:
+            entry = json.load(f)
+        if "/pokemon-species/" in entry["url"]:
+            payloads["species"].append(entry["body"])
+        elif "/pokemon/" in entry["url"]:
+            payloads["pokemon"].append(entry["body"])
+
+    print(f"{'payload':<22}{'json ms':>10}{'proj ms':>10}{'speedup':>9}{'json KB':>12}{'proj KB':>12}")
+    for kind, fields in (("pokemon", POKEMON_FIELDS), ("species", SPECIES_FIELDS)):
+        texts = payloads[kind]
+        if not texts:
+            print(f"{kind:<22}no recorded payloads in {cache_dir}")
+            continue
+        full_ms = timeit.timeit(lambda: [json.loads(t) for t in texts], number=repeat) / repeat / len(texts) * 1e3
+        fast_ms = timeit.timeit(lambda: [project(t, fields) for t in texts], number=repeat) / repeat / len(texts) * 1e3
+        full_peak = max(_peak_bytes(lambda: json.loads(t)) for t in texts)
+        fast_peak = max(_peak_bytes(lambda: project(t, fields)) for t in texts)
+        _print_row(f"{kind} (n={len(texts)})", full_ms, fast_ms, full_peak, fast_peak)
+
+
+def bench_load(sizes=(250, 100_000), repeat=5):
+    """Startup data load: CSV + to_numeric coercion vs the typed Parquet file."""
+    import contextlib
+    import io
+    import pandas as pd
+    import APPF
+
+    base = pd.read_parquet(APPF.PARQUET_PATH)
+    print(f"{'rows':>8}  {'source':<10}{'load ms':>10}{'frame KB':>12}{'file KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            frame = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).head(rows)
+            frame["id"] = range(1, rows + 1)
+            paths = {"csv": os.path.join(tmp, f"{rows}.csv"), "parquet": os.path.join(tmp, f"{rows}.parquet")}
+            frame.to_csv(paths["csv"], index=False)
+            frame.to_parquet(paths["parquet"], index=False)
+            for label, path in paths.items():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    loaded = APPF.load_pokemon_data(path)
+                    ms = timeit.timeit(lambda: APPF.load_pokemon_data(path), number=repeat) / repeat * 1e3
+                print(f"{rows:>8}  {label:<10}{ms:>10.2f}{loaded.memory_usage(deep=True).sum() / 1024:>12.1f}"
+                      f"{os.path.getsize(path) / 1024:>10.1f}")
+
+
+def bench_lookup(sizes=(250, 10_000, 100_000), repeat=2000):
+    """Per-callback record lookup: boolean mask + iloc[0] vs ArrowStore's position() + row_at() on a fresh store.
+
+    Every id is looked up once, so nothing is answered from an earlier lookup.
+    """
+    import pandas as pd
+    import APPF
+    from arrow_store import ArrowStore
+
+    base = pd.read_parquet(APPF.PARQUET_PATH)
+    print(f"{'rows':>8}{'mask us':>10}{'position us':>13}{'row_at us':>11}{'store us':>10}{'build ms':>10}")
+    for rows in sizes:
+        frame = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).head(rows)
+        frame["id"] = range(1, rows + 1)
+        ids = [1 + (i * 7919) % rows for i in range(min(repeat, rows))]
+        build_ms = timeit.timeit(lambda: ArrowStore.from_frame(frame), number=1) * 1e3
+        store = ArrowStore.from_frame(frame)
+        mask_us = timeit.timeit(lambda: [frame[frame["id"] == i].iloc[0] for i in ids[:200]], number=1) / 200 * 1e6
+        position_us = timeit.timeit(lambda: [store.position(i) for i in ids], number=1) / len(ids) * 1e6
+        positions = [store.position(i) for i in ids]
+        row_us = timeit.timeit(lambda: [store.row_at(pos) for pos in positions], number=1) / len(ids) * 1e6
+        print(f"{rows:>8}{mask_us:>10.1f}{position_us:>13.2f}{row_us:>11.1f}{position_us + row_us:>10.1f}"
+              f"{build_ms:>10.1f}")
+
+
+def _callback_request(dependency, values):
+    """The /_dash-update-component body the Dash renderer sends for `dependency`, given {"id.property": value}."""
+    outputs = [dict(zip(("id", "property"), spec.rsplit(".", 1)))
+               for spec in dependency["output"].strip(".").split("...")]
+    return {
+        "output": dependency["output"],
+        "outputs": outputs if dependency["output"].startswith("..") else outputs[0],
+        "inputs": [dict(i, value=values.get(f"{i['id']}.{i['property']}")) for i in dependency["inputs"]],
+        "state": [dict(s, value=values.get(f"{s['id']}.{s['property']}")) for s in dependency["state"]],
+        "changedPropIds": [f"{i['id']}.{i['property']}" for i in dependency["inputs"]],
+    }
+
+
+def bench_click_payload(sizes=(250, 5_000)):
+    """Request bytes for an image click: the old ALL n_clicks/id lists vs the request APPF's router callback takes.
+
+    The router request is built from the app's own /_dash-dependencies entry, with
+    the value the clientside click handler stores in clicked_image.
+    """
+    import contextlib
+    import io
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import APPF
+    client = APPF.server.test_client()
+    router = next(dep for dep in client.get("/_dash-dependencies").get_json()
+                  if not dep.get("clientside_function") and {"id": "clicked_image", "property": "data"} in dep["inputs"])
+
+    print(f"{'cards':>7}{'ALL bytes':>12}{'router bytes':>14}")
+    for cards in sizes:
+        clicked = cards // 2
+        legacy = {
+            "output": "selected_pokemon_id.data",
+            "outputs": {"id": "selected_pokemon_id", "property": "data"},
+            "inputs": [[{"id": {"index": i, "type": "gallery_img"}, "property": "n_clicks",
+                         "value": 1 if i == clicked else None} for i in range(1, cards + 1)]],
+            "state": [[{"id": {"index": i, "type": "gallery_img"}, "property": "id",
+                        "value": {"index": i, "type": "gallery_img"}} for i in range(1, cards + 1)]],
+            "changedPropIds": [json.dumps({"index": clicked, "type": "gallery_img"}) + ".n_clicks"],
+        }
+        request = _callback_request(router, {
+            "clicked_image.data": {"type": "gallery_img", "index": clicked, "n_clicks": 1},
+            "comparison_store.data": {"pokemon1": None, "pokemon2": None},
+        })
+        print(f"{cards:>7}{len(json.dumps(legacy)):>12}{len(json.dumps(request)):>14}")
+
+
+def bench_interaction_bytes(pokemon_id=25, other_id=150):
+    """Response body bytes per user interaction, replaying the requests the browser would send.
+
+    "before" is what the server sent before compression and validators were
+    added: no Content-Encoding and the whole page again on a repeat visit. The
+    other columns negotiate that encoding and revalidate with If-None-Match,
+    skipping the immutable (fingerprinted) scripts the browser still has.
+    """
+    import contextlib
+    import gzip
+    import io
+    import re
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import APPF
+    client = APPF.server.test_client()
+
+    def replay(encoding, revalidate):
+        headers = {"Accept-Encoding": encoding}
+        etags = {}
+
+        def get(path):
+            request_headers = dict(headers)
+            if revalidate and path in etags:
+                request_headers["If-None-Match"] = etags[path]
+            response = client.get(path, headers=request_headers)
+            if response.status_code not in (200, 304):
+                raise AssertionError(f"GET {path}: {response.status_code}")
+            if response.headers.get("ETag"):
+                etags[path] = response.headers["ETag"]
+            return response
+
+        def page_load(repeat):
+            index = get("/")
+            size = len(index.data)
+            for src in re.findall(r'<script src="([^"]+)"', decode(index).decode()):
+                if repeat and revalidate and "immutable" in cached.get(src, ""):
+                    continue
+                response = get(src)
+                cached[src] = response.headers.get("Cache-Control", "")
+                size += len(response.data)
+            for path in ("/_dash-layout", "/_dash-dependencies"):
+                size += len(get(path).data)
+            return size
+
+        def post(outputs, inputs, state=(), changed=(), output=None):
+            body = {
+                "output": output or (f"{outputs[0]['id']}.{outputs[0]['property']}" if len(outputs) == 1
+                                     else ".." + "...".join(f"{o['id']}.{o['property']}" for o in outputs) + ".."),
+                "outputs": outputs[0] if len(outputs) == 1 else list(outputs),
+                "inputs": list(inputs), "state": list(state), "changedPropIds": list(changed),
+            }
+            response = client.post("/_dash-update-component", json=body, headers=headers)
+            if response.status_code == 204:
+                return 0, None
+            if response.status_code != 200:
+                raise AssertionError(f"{body['output']}: {response.status_code} {response.data[:200]}")
+            return len(response.data), json.loads(decode(response))
+
+        def display(shown_id, comparison, view, changed):
+            return post([{"id": "pokemon_content", "property": "children"}, {"id": "displayed_view", "property": "data"}],
+                        [{"id": "pokemon_dropdown", "property": "value", "value": shown_id},
+                         {"id": "comparison_store", "property": "data", "value": comparison},
+                         {"id": "selected_pokemon_id", "property": "data", "value": None}],
+                        [{"id": "displayed_view", "property": "data", "value": view}], [changed])
+
+        def border(shown_id, comparison):
+            return post([[{"id": {"index": shown_id, "type": "pokemon_img"}, "property": "style"}]],
+                        [{"id": "comparison_store", "property": "data", "value": comparison}],
+                        changed=["comparison_store.data"], output='{"index":["ALL"],"type":"pokemon_img"}.style')
+
+        def click_sprite(shown_id, comparison):
+            clicked = {"type": "pokemon_img", "index": shown_id, "n_clicks": 1}
+            size, body = post([{"id": "selected_pokemon_id", "property": "data"},
+                               {"id": "pokemon_dropdown", "property": "value"},
+                               {"id": "comparison_store", "property": "data"},
+                               {"id": "comparison_names", "property": "data"}],
+                              [{"id": "clicked_image", "property": "data", "value": clicked}],
+                              [{"id": "comparison_store", "property": "data", "value": comparison}],
+                              ["clicked_image.data"])
+            return size, body["response"]["comparison_store"]["data"]
+
+        cached = {}
+        empty = {"pokemon1": None, "pokemon2": None}
+        rows = [("page load", [("page", page_load(repeat=False))])]
+
+        size, body = display(pokemon_id, empty, None, "pokemon_dropdown.value")
+        view = body["response"]["displayed_view"]["data"]
+        rows.append(("open detail", [("update_display", size)]))
+
+        router_size, comparison = click_sprite(pokemon_id, empty)
+        display_size, _ = display(pokemon_id, comparison, view, "comparison_store.data")
+        border_size, _ = border(pokemon_id, comparison)
+        rows.append(("mark for comparison", [("route_image_click", router_size), ("update_display", display_size),
+                                             ("update_comparison_border", border_size)]))
+
+        size, body = display(other_id, comparison, view, "pokemon_dropdown.value")
+        view = body["response"]["displayed_view"]["data"]
+        rows.append(("open second detail", [("update_display", size)]))
+
+        router_size, comparison = click_sprite(other_id, comparison)
+        display_size, body = display(other_id, comparison, view, "comparison_store.data")
+        view = body["response"]["displayed_view"]["data"]
+        border_size, _ = border(other_id, comparison)
+        rows.append(("compare", [("route_image_click", router_size), ("update_display", display_size),
+                                 ("update_comparison_border", border_size)]))
+
+        display_size, _ = display(other_id, empty, view, "comparison_store.data")
+        border_size, _ = border(other_id, empty)
+        rows.append(("back to single view", [("update_display", display_size),
+                                             ("update_comparison_border", border_size)]))
+
+        rows.append(("repeat page load", [("page", page_load(repeat=True))]))
+        return rows
+
+    def decode(response):
+        if response.content_encoding == "br":
+            import brotli
+            return brotli.decompress(response.data)
+        if response.content_encoding == "gzip":
+            return gzip.decompress(response.data)
+        return response.data
+
+    columns = {"before": replay("identity", revalidate=False)}
+    for encoding in APPF.compressor.encodings:
+        columns[encoding] = replay(encoding, revalidate=True)
+    totals = {name: [sum(size for _, size in calls) for _, calls in rows] for name, rows in columns.items()}
+    labels = [label for label, _ in columns["before"]]
+
+    print(f"{'interaction':<22}" + "".join(f"{name:>10}" for name in totals) + "  callbacks (before)")
+    for i, label in enumerate(labels):
+        calls = columns["before"][i][1]
+        print(f"{label:<22}" + "".join(f"{sizes[i]:>10}" for sizes in totals.values()) + "  "
+              + ", ".join(f"{name} {size}" for name, size in calls))
+    print(f"{'session':<22}" + "".join(f"{sum(sizes):>10}" for sizes in totals.values()))
+
+
+def bench_global_figures(sizes=(250, 2_000, 20_000, 300_000)):
+    """Bytes of the happiness scatter and a stat histogram as sent to the browser, every row vs server-side binning.
+
+    "jittered" spreads the discrete hatch counter / happiness values so that
+    the distinct pairs exceed the point limit and the density grid is used.
+    """
+    import contextlib
+    import io
+    import numpy as np
+    import pandas as pd
+    import plotly.graph_objects as go
+    import plotly.utils
+    import APPF
+    import clean_data1
+
+    def size(figure):
+        return len(json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder))
+
+    base = pd.read_parquet(APPF.PARQUET_PATH)
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8}  {'data':<10}{'points':>8}{'all KB':>10}{'binned KB':>11}{'bin ms':>8}")
+    for rows in sizes:
+        frame = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).head(rows)
+        jittered = frame.assign(hatch_counter=frame["hatch_counter"] + rng.uniform(0, 5, rows),
+                                base_happiness=frame["base_happiness"] + rng.uniform(0, 10, rows))
+        for label, df in (("tiled", frame), ("jittered", jittered)):
+            every_row = {"hatch_counter": df["hatch_counter"].tolist(),
+                         "base_happiness": df["base_happiness"].tolist(), "name": df["name"].tolist()}
+            start = timeit.default_timer()
+            points = clean_data1.scatter_points(df, "hatch_counter", "base_happiness")
+            bin_ms = (timeit.default_timer() - start) * 1e3
+            print(f"{rows:>8}  {label:<10}{len(points['hatch_counter']):>8}"
+                  f"{size(APPF.happiness_scatter_figure({'happiness': every_row})) / 1024:>10.1f}"
+                  f"{size(APPF.happiness_scatter_figure({'happiness': points})) / 1024:>11.1f}{bin_ms:>8.1f}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = APPF.Dataset(None)
+        data.aggregates = clean_data1.compute_aggregates(frame)
+        client_binned = go.Figure(go.Histogram(x=frame["attack"].tolist()))
+        print(f"{rows:>8}  {'attack':<10}{'':>8}{size(client_binned) / 1024:>10.1f}"
+              f"{size(APPF.stat_histogram_figure(data, 'attack')) / 1024:>11.1f}")
+
+
+def bench_throughput(url="http://127.0.0.1:8050", seconds=10, concurrency=16, ids=range(1, 251)):
+    """Detail-view requests per second against a running server (python APPF.py or python wsgi.py)."""
+    import statistics
+    import time
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+
+    def body(pokemon_id):
+        return json.dumps({
+            "output": "..pokemon_content.children...displayed_view.data..",
+            "outputs": [{"id": "pokemon_content", "property": "children"},
+                        {"id": "displayed_view", "property": "data"}],
+            "inputs": [{"id": "pokemon_dropdown", "property": "value", "value": pokemon_id},
+                       {"id": "comparison_store", "property": "data", "value": {"pokemon1": None, "pokemon2": None}},
+                       {"id": "selected_pokemon_id", "property": "data", "value": None}],
+            "state": [{"id": "displayed_view", "property": "data", "value": None}],
+            "changedPropIds": ["pokemon_dropdown.value"],
+        }).encode()
+
+    bodies = [body(pokemon_id) for pokemon_id in ids]
+
+    def worker(offset):
+        latencies, errors = [], 0
+        deadline = time.monotonic() + seconds
+        i = offset
+        while time.monotonic() < deadline:
+            request = urllib.request.Request(url + "/_dash-update-component", data=bodies[i % len(bodies)],
+                                             headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                latencies.append(time.perf_counter() - start)
+            except OSError:
+                errors += 1
+            i += concurrency
+        return latencies, errors
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    if not latencies:
+        raise RuntimeError(f"no successful requests to {url}")
+    print(f"{len(latencies) / seconds:.1f} req/s over {seconds}s with {concurrency} clients, "
+          f"p50 {statistics.median(latencies) * 1e3:.1f} ms, p95 {latencies[int(len(latencies) * 0.95)] * 1e3:.1f} ms, "
+          f"{errors} errors")
+
+
+_STARTUP_CODE = """
+import json, sys, time
+started = float(sys.argv[1])
+import APPF
+client = APPF.server.test_client()
+for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+    assert client.get(path).status_code == 200, path
+response = client.post("/_dash-update-component", json={
+    "output": "..pokemon_content.children...displayed_view.data..",
+    "outputs": [{"id": "pokemon_content", "property": "children"}, {"id": "displayed_view", "property": "data"}],
+    "inputs": [{"id": "pokemon_dropdown", "property": "value", "value": None},
+               {"id": "comparison_store", "property": "data", "value": {"pokemon1": None, "pokemon2": None}},
+               {"id": "selected_pokemon_id", "property": "data", "value": None}],
+    "state": [{"id": "displayed_view", "property": "data", "value": None}],
+    "changedPropIds": [],
+})
+assert response.status_code == 200, response.data[:200]
+print(json.dumps({"first_response": time.time() - started, "steps": APPF.startup_profile}))
+"""
+
+
+def _startup_env():
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                                     os.environ.get("PYTHONPATH")])))
+
+
+def _startup_runs(env, repeat):
+    """`repeat` cold starts, each a fresh interpreter running _STARTUP_CODE; returns their timings."""
+    import time
+
+    runs = []
+    for _ in range(repeat):
+        started = time.time()
+        result = subprocess.run([sys.executable, "-c", _STARTUP_CODE, repr(started)],
+                                env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return runs
+
+
+def bench_startup(budget_s=STARTUP_BUDGET_S, repeat=5):
+    """Cold start of APPF.py: imports by package, module init steps, and time to the first rendered page.
+
+    Each run is a fresh interpreter that imports APPF, fetches the page,
+    layout and dependencies, and renders the initial view. The median is
+    reported against `budget_s`, which test_regressions.py enforces.
+    """
+    import statistics
+
+    env = _startup_env()
+
+    # -X importtime lines are "self | cumulative | name", indented two spaces per
+    # nesting level and printed after the module's own imports; APPF's direct
+    # imports (depth 1) are charged to their package.
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import APPF"],
+                            env=env, capture_output=True, text=True, check=True)
+    pending, imports, body_us = {}, {}, 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "APPF":
+                imports, body_us = pending, int(self_us)
+            pending = {}
+        elif depth == 1:
+            package = name.strip().split(".")[0]
+            pending[package] = pending.get(package, 0) + int(cumulative_us)
+    print(f"{'import':<22}{'ms':>9}")
+    for package, us in sorted(imports.items(), key=lambda item: -item[1]):
+        if us >= 1000:
+            print(f"{package:<22}{us / 1000:>9.1f}")
+    print(f"{'APPF module body':<22}{body_us / 1000:>9.1f}")
+
+    runs = _startup_runs(env, repeat)
+    print(f"\n{'init step':<22}{'ms':>9}")
+    for step in runs[0]["steps"]:
+        print(f"{step:<22}{statistics.median(run['steps'][step] for run in runs) * 1e3:>9.1f}")
+
+    first_response = statistics.median(run["first_response"] for run in runs)
+    print(f"\ncold start to first response {first_response:.2f} s (median of {repeat}), budget {budget_s:.2f} s")
+
+
+def bench_hot_reload(rows=20_000, clients=4, interval=0.2, timeout=60):
+    """Re-clean the data under a running APPF: change detection, background build and swap under load.
+
+    v1 is the real dataset and v2 a `rows`-row copy with every name suffixed,
+    both written by clean_data1.save() into a temporary directory. Fails if a
+    request errors, shows names from both versions, goes back to v1 after
+    seeing v2, or if no request completes while v2 is built.
+    """
+    import contextlib
+    import io
+    import statistics
+    import threading
+    import time
+    import pandas as pd
+    from clean_data1 import save
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import APPF
+    base = pd.read_parquet(APPF.PARQUET_PATH)
+    base = base.astype({col: object for col in base.columns if isinstance(base[col].dtype, pd.CategoricalDtype)})
+    v2 = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).head(rows)
+    v2["id"] = range(1, rows + 1)
+    v2["name"] = v2["name"] + "-v2"
+    names = {version: {n for name in frame["name"] for n in (name, name.capitalize())}
+             for version, frame in (("v1", base), ("v2", v2))}
+
+    def versions_in(response):
+        found, stack = set(), [response]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                stack.extend(value.values())
+            elif isinstance(value, list):
+                stack.extend(value)
+            elif isinstance(value, str):
+                found.update(version for version, known in names.items() if value in known)
+        return found
+
+    def display_body(pokemon_id):
+        return {
+            "output": "..pokemon_content.children...displayed_view.data..",
+            "outputs": [{"id": "pokemon_content", "property": "children"}, {"id": "displayed_view", "property": "data"}],
+            "inputs": [{"id": "pokemon_dropdown", "property": "value", "value": pokemon_id},
+                       {"id": "comparison_store", "property": "data", "value": {"pokemon1": None, "pokemon2": None}},
+                       {"id": "selected_pokemon_id", "property": "data", "value": None}],
+            "state": [{"id": "displayed_view", "property": "data", "value": None}],
+            "changedPropIds": ["pokemon_dropdown.value"],
+        }
+
+    results, stop = [], threading.Event()
+
+    def client(offset):
+        http = APPF.server.test_client()
+        i = offset
+        while not stop.is_set():
+            pokemon_id = None if i % 5 == 0 else 1 + i % len(base)
+            start = time.perf_counter()
+            response = http.post("/_dash-update-component", json=display_body(pokemon_id))
+            end = time.perf_counter()
+            found = versions_in(response.get_json()) if response.status_code == 200 else set()
+            results.append((offset, end, end - start, response.status_code, found))
+            i += clients
+
+    saved = {name: getattr(APPF, name) for name in ("CSV_PATH", "PARQUET_PATH", "ARROW_PATH", "AGGREGATES_PATH")}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, os.path.basename(path.replace("\\", "/"))) for name, path in saved.items()}
+        args = (paths["CSV_PATH"], paths["PARQUET_PATH"], paths["AGGREGATES_PATH"], paths["ARROW_PATH"])
+        try:
+            for name, path in paths.items():
+                setattr(APPF, name, path)
+            APPF.RELOAD_INTERVAL_S = interval
+            with contextlib.redirect_stdout(io.StringIO()):
+                save(base, *args)
+                APPF.reload_dataset()
+                v1 = APPF.dataset
+                threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+                for thread in threads:
+                    thread.start()
+                time.sleep(1)
+                written = time.perf_counter()
+                save(v2, *args)
+                while APPF.dataset is v1 and time.perf_counter() - written < timeout:
+                    time.sleep(0.01)
+                swapped = time.perf_counter()
+                time.sleep(1)
+                stop.set()
+                for thread in threads:
+                    thread.join()
+        finally:
+            stop.set()
+            for name, path in saved.items():
+                setattr(APPF, name, path)
+
+    if APPF.dataset is v1:
+        raise AssertionError(f"v2 was not picked up within {timeout}s: {APPF.reload_stats}")
+    build_s = APPF.reload_stats["last_build_s"]
+    built = swapped - build_s
+
+    errors = [r for r in results if r[3] != 200]
+    mixed = [r for r in results if len(r[4]) > 1]
+    regressed = [r for r in results if "v1" in r[4] and any(o[0] == r[0] and o[1] < r[1] and "v2" in o[4] for o in results)]
+    before = [r[2] for r in results if r[1] < written]
+    during = [r[2] for r in results if built <= r[1] < swapped]
+    after = [r[2] for r in results if r[1] >= swapped]
+
+    print(f"v2: {rows} rows, swapped in {swapped - written:.2f}s after the re-clean started, built in {build_s:.2f}s")
+    print(f"{'window':<16}{'requests':>9}{'p50 ms':>9}{'max ms':>9}")
+    for label, latencies in (("before", before), ("during build", during), ("after swap", after)):
+        if latencies:
+            print(f"{label:<16}{len(latencies):>9}{statistics.median(latencies) * 1e3:>9.1f}{max(latencies) * 1e3:>9.1f}")
+    print(f"{len(errors)} errors, {len(mixed)} mixed-version responses, {len(regressed)} went back to v1")
+    if errors or mixed or regressed:
+        raise AssertionError("requests saw an inconsistent dataset during the reload")
+    if not during:
+        raise AssertionError(f"no request completed during the {build_s:.2f}s build")
+
+
+_WORKER_CODE = """
+import sys
+import numpy as np, pandas as pd
+from arrow_store import ArrowStore
+mode, path = sys.argv[1], sys.argv[2]
+if mode == "arrow":
+    table = ArrowStore.open(path).table
+    # Read every mapped page, like a worker that has served all views would.
+    [np.frombuffer(buf, dtype=np.uint8).max() for c in table.columns for chunk in c.chunks for buf in chunk.buffers() if buf]
+elif mode == "parquet":
+    df = pd.read_parquet(path)
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def _pss_mb(pid):
+    # Linux only: proportional set size splits shared pages between the processes mapping them.
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("Pss:")) / 1024
+
+
+def _workers_pss_mb(mode, path, count):
+    procs = [subprocess.Popen([sys.executable, "-c", _WORKER_CODE, mode, path], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(count)]
+    try:
+        for proc in procs:
+            if proc.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"{mode} worker failed to load {path}")
+        return sum(_pss_mb(proc.pid) for proc in procs)
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+
+def _worker_files(tmp, rows):
+    """Write `rows` rows, repeated from the cleaned dataset, as Parquet and as a mapped Arrow file under `tmp`."""
+    import pandas as pd
+    import APPF
+    from clean_data1 import save_arrow
+
+    base = pd.read_parquet(APPF.PARQUET_PATH)
+    frame = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).head(rows)
+    frame["id"] = range(1, rows + 1)
+    paths = {"parquet": os.path.join(tmp, "data.parquet"), "arrow": os.path.join(tmp, "data.arrow")}
+    frame.to_parquet(paths["parquet"], index=False)
+    save_arrow(frame.astype({col: object for col in frame.columns if isinstance(frame[col].dtype, pd.CategoricalDtype)}),
+               paths["arrow"])
+    return paths
+
+
+def bench_worker_memory(rows=300_000, workers=(1, 2, 4)):
+    """Total PSS of N independent worker processes holding the dataset: private Parquet copies vs the mapped Arrow file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _worker_files(tmp, rows)
+        print(f"{rows} rows, arrow file {os.path.getsize(paths['arrow']) / 2**20:.1f} MB")
+        print(f"{'workers':>8}{'baseline MB':>13}{'parquet MB':>12}{'arrow MB':>10}{'parquet data':>14}{'arrow data':>12}")
+        for count in workers:
+            baseline = _workers_pss_mb("baseline", "", count)
+            totals = {mode: _workers_pss_mb(mode, path, count) for mode, path in paths.items()}
+            print(f"{count:>8}{baseline:>13.1f}{totals['parquet']:>12.1f}{totals['arrow']:>10.1f}"
+                  f"{totals['parquet'] - baseline:>14.1f}{totals['arrow'] - baseline:>12.1f}")
+
+
+def _peak_rss_mb(code):
+    # Unix only: wait4 reports the child's own peak RSS (in KB on Linux).
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise RuntimeError(f"benchmark child failed: {code}")
+    return usage.ru_maxrss / 1024
+
+
+def bench_clean_memory(sizes=(10_000, 50_000, 200_000), chunk_size=10_000):
+    """Peak RSS of clean_data1 full mode (json.load) vs --stream mode on growing synthetic inputs."""
+    from clean_data1 import LOAD_PATH
+
+    with open(LOAD_PATH) as f:
+        base = json.load(f)
+
+    print(f"{'records':>9}{'full MB':>10}{'stream MB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_json, raw_jsonl = os.path.join(tmp, "raw.json"), os.path.join(tmp, "raw.jsonl")
+        # Every output goes to tmp: the defaults are the live files the dashboard serves.
+        out = {ext: os.path.join(tmp, "out." + ext) for ext in ("csv", "parquet", "manifest", "aggregates", "arrow")}
+        for size in sizes:
+            # Written record by record: a forked child's peak RSS starts from the parent's.
+            with open(raw_json, "w") as f, open(raw_jsonl, "w") as f_lines:
+                f.write("[")
+                for i in range(size):
+                    line = json.dumps(dict(base[i % len(base)], id=i + 1))
+                    f.write(("," if i else "") + line)
+                    f_lines.write(line + "\n")
+                f.write("]")
+
+            full = _peak_rss_mb(f"import clean_data1; clean_data1.clean_all({raw_json!r}, {out['csv']!r}, "
+                                f"{out['parquet']!r}, {out['manifest']!r}, aggregates_path={out['aggregates']!r}, "
+                                f"arrow_path={out['arrow']!r})")
+            stream = _peak_rss_mb(f"import clean_data1; clean_data1.clean_stream({raw_jsonl!r}, {out['csv']!r}, "
+                                  f"{out['parquet']!r}, chunk_size={chunk_size}, "
+                                  f"aggregates_path={out['aggregates']!r}, arrow_path={out['arrow']!r}, "
+                                  f"manifest_path={out['manifest']!r})")
+            print(f"{size:>9}{full:>10.1f}{stream:>11.1f}")
+
+def bench_incremental(sizes=(5_000, 50_000), repeat=3):
+    """clean_data1 --incremental after editing one record, adding five and removing one, vs re-cleaning everything."""
+    import contextlib
+    import io
+    import time
+    import clean_data1
+    from clean_data1 import LOAD_PATH
+
+    with open(LOAD_PATH) as f:
+        base = json.load(f)
+
+    print(f"{'records':>9}{'full ms':>10}{'incremental ms':>16}{'unchanged ms':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "raw.jsonl")
+        out = dict(save_path=os.path.join(tmp, "out.csv"), parquet_path=os.path.join(tmp, "out.parquet"),
+                   manifest_path=os.path.join(tmp, "out.manifest"), aggregates_path=os.path.join(tmp, "out.aggregates"),
+                   arrow_path=os.path.join(tmp, "out.arrow"))
+
+        def write_raw(records):
+            with open(raw, "w") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+
+        for size in sizes:
+            records = [dict(base[i % len(base)], id=i + 1) for i in range(size)]
+            full = incremental = unchanged = float("inf")
+            for run in range(repeat):
+                write_raw(records)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    clean_data1.clean_stream(raw, out["save_path"], out["parquet_path"],
+                                             aggregates_path=out["aggregates_path"], arrow_path=out["arrow_path"],
+                                             manifest_path=out["manifest_path"])
+                full = min(full, time.perf_counter() - start)
+
+                changed = [dict(record) for record in records[1:]]
+                changed[size // 2]["hp"] = 1 + run
+                changed += [dict(base[i % len(base)], id=size + i + 1) for i in range(5)]
+                write_raw(changed)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    clean_data1.clean_incremental(raw, **out)
+                    incremental = min(incremental, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    clean_data1.clean_incremental(raw, **out)
+                    unchanged = min(unchanged, time.perf_counter() - start)
+            print(f"{size:>9}{full * 1e3:>10.0f}{incremental * 1e3:>16.0f}{unchanged * 1e3:>14.0f}")
+
+
+BENCHMARKS = {
+    "projection": bench_projection,
+    "load": bench_load,
+    "lookup": bench_lookup,
+    "click-payload": bench_click_payload,
+    "interaction-bytes": bench_interaction_bytes,
+    "global-figures": bench_global_figures,
+    "throughput": bench_throughput,
+    "startup": bench_startup,
+    "hot-reload": bench_hot_reload,
+    "worker-memory": bench_worker_memory,
+    "clean-memory": bench_clean_memory,
+    "incremental": bench_incremental,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the Pokémon pipeline.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark]()
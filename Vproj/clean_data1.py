@@ -1,36 +1,708 @@
 
 import json
+import hashlib
+import os
+import shutil
+import argparse
+from itertools import islice
+import numpy as np
 import pandas as pd
+from arrow_store import ArrowStore, file_signature, to_numpy
 
 LOAD_PATH = r"C:\Users\kubag\Desktop\Vproj\raw_pokemon.json"
 SAVE_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.csv"
+PARQUET_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.parquet"
+ARROW_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.arrow"
+MANIFEST_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.manifest.json"
+AGGREGATES_PATH = r"C:\Users\kubag\Desktop\Vproj\cleaned_pokemon.aggregates.json"
+STREAM_LOAD_PATH = r"C:\Users\kubag\Desktop\Vproj\raw_pokemon.records.jsonl"
+CHUNK_SIZE = 10_000
 
-with open(LOAD_PATH) as f:
-    data = json.load(f)
+# Typed columnar output read by APPF.py: small unsigned ints for stats,
+# categoricals for the low-cardinality labels.
+COMPACT_DTYPES = {
+    "id": "uint32",
+    "base_experience": "UInt16",
+    "height": "uint16",
+    "weight": "uint16",
+    "type_1": "category",
+    "type_2": "category",
+    "hp": "uint8",
+    "attack": "uint8",
+    "defense": "uint8",
+    "special-attack": "uint8",
+    "special-defense": "uint8",
+    "speed": "uint8",
+    "gender_rate": "int8",
+    "capture_rate": "uint8",
+    "is_legendary": "bool",
+    "base_happiness": "uint8",
+    "hatch_counter": "uint8",
+    "evolution_chain_id": "uint32",
+    "evolution_stage": "uint8",
+    "gender_distribution": "category",
+    "male_pct": "float32",
+    "female_pct": "float32",
+    "is_genderless": "bool",
+}
 
-df = pd.DataFrame(data)
+# Bump whenever clean() or the manifest changes what it produces. Stored in the
+# manifest along with COMPACT_DTYPES, so --incremental re-cleans everything
+# after an upgrade instead of merging rows from two versions of the cleaner.
+CLEANER_VERSION = 3
 
-def gender_label(rate):
-    if rate == -1:
-        return "Genderless"
-    elif rate == 0:
-        return "100% Male"
-    elif rate == 8:
-        return "100% Female"
-    else:
-        female_pct = rate * 12.5
-        male_pct = 100 - female_pct
-        return f"{int(male_pct)}% Male / {int(female_pct)}% Female"
+STAT_COLUMNS = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+HISTOGRAM_BINS = 20
+PERCENTILES = (5, 25, 50, 75, 95)
+# Above this many points the happiness scatter is sent as density cells, and
+# distinct (x, y) pairs beyond it are counted on a SCATTER_DENSITY_BINS grid.
+SCATTER_POINT_LIMIT = 2000
+SCATTER_DENSITY_BINS = 40
+# Label id of a scatter pair whose labelled row was removed, until relabel() finds the next one.
+UNKNOWN_ID = np.iinfo(np.int64).max
+
+def add_gender_columns(df):
+    # gender_rate is the female share in eighths, or -1 for genderless species.
+    rate = df["gender_rate"]
+    genderless = rate == -1
+    female_pct = (rate * 12.5).where(~genderless, 0.0)
+    male_pct = (100 - female_pct).where(~genderless, 0.0)
+
+    label = male_pct.astype(int).astype(str) + "% Male / " + female_pct.astype(int).astype(str) + "% Female"
+    df["gender_distribution"] = label.mask(rate == 0, "100% Male").mask(rate == 8, "100% Female").mask(genderless, "Genderless")
+    df["male_pct"] = male_pct
+    df["female_pct"] = female_pct
+    df["is_genderless"] = genderless
+    return df
+
+def clean(data):
+    df = pd.DataFrame(data)
+
+    add_gender_columns(df)
+
+    df["egg_groups"] = df["egg_groups"].fillna("")
+
+    df["base_happiness"] = df["base_happiness"].fillna(0).astype(int)
+    df["hatch_counter"] = df["hatch_counter"].fillna(0).astype(int)
+
+    df["evolution_stage"] = df["evolution_stage"].fillna(1).astype(int)
+    df["evolution_chain_id"] = df["evolution_chain_id"].fillna(df["id"]).astype(int)
+    return df
+
+def write_csv(df, save_path, **kwargs):
+    # Through the fixed numeric dtypes rather than what pandas inferred for this
+    # frame: a column with one null would otherwise write 64.0 instead of 64,
+    # and differently from one chunk to the next in stream mode.
+    numeric = {col: dtype for col, dtype in COMPACT_DTYPES.items() if dtype != "category" and col in df.columns}
+    return df.astype(numeric).to_csv(save_path, index=False, **kwargs)
+
+def save(df, save_path=SAVE_PATH, parquet_path=PARQUET_PATH, aggregates_path=AGGREGATES_PATH,
+         arrow_path=ARROW_PATH):
+    write_csv(df, save_path)
+
+    # Categories in order of first appearance, so value_counts() ties order like the CSV's strings do.
+    compact_dtypes = dict(COMPACT_DTYPES)
+    for col, dtype in COMPACT_DTYPES.items():
+        if dtype == "category":
+            compact_dtypes[col] = pd.CategoricalDtype(df[col].dropna().unique())
+    df.astype(compact_dtypes).to_parquet(parquet_path, index=False)
+    save_arrow(df.sort_values("id"), arrow_path)
+    aggregates = AggregateAccumulator()
+    aggregates.add(df)
+    save_aggregates(aggregates.result(), [save_path, parquet_path, arrow_path], aggregates_path)
+    print(f" Cleaned and saved to {save_path}, {parquet_path}, {arrow_path} and {aggregates_path}")
+    return aggregates
+
+def save_arrow(df, arrow_path=ARROW_PATH):
+    """Uncompressed Arrow IPC file in id order, which APPF.py memory-maps instead of reading."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, schema=arrow_schema(df.columns, dictionaries=False), preserve_index=False)
+    # One record batch: per-chunk metadata is private to every process that maps the file.
+    table = table.combine_chunks()
+    with pa.OSFile(arrow_path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    # Swapped in rather than overwritten: a running dashboard maps the old
+    # file, and truncating it under the mapping would crash its workers.
+    os.replace(arrow_path + ".tmp", arrow_path)
+
+def percentiles_from_counts(values, counts, percentiles):
+    """np.percentile (linear method) of the data `counts` times each of the sorted `values`, without expanding it."""
+    cum = np.cumsum(counts)
+    n = int(cum[-1])
+    virtual = (n - 1) * (np.asarray(percentiles, dtype=float) / 100)
+    lo = np.floor(virtual)
+    t = virtual - lo
+    lo = lo.astype(np.int64)
+    a = values[np.searchsorted(cum, lo, side="right")]
+    b = values[np.searchsorted(cum, np.minimum(lo + 1, n - 1), side="right")]
+    # Same interpolation as numpy's, so the results are identical to the last bit.
+    return np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+
+class ScatterAccumulator:
+    """Scatter points of `y` against `x`, fed a chunk at a time: one per row up to SCATTER_POINT_LIMIT rows,
+    otherwise density cells.
+
+    Rows with the same (x, y) are merged into one point with a "count" and
+    the label of the row with the lowest id. If that still leaves more than
+    SCATTER_POINT_LIMIT points, counts go on a SCATTER_DENSITY_BINS x
+    SCATTER_DENSITY_BINS grid instead (cell centres, no labels), so the output
+    size never depends on the row count. Only the distinct pairs are kept
+    between chunks, which for the small-integer columns plotted here is a
+    bounded number. Rows can be taken out again with remove().
+    """
+
+    def __init__(self, x, y, label="name"):
+        self.x, self.y, self.label = x, y, label
+        self.rows = 0
+        # Every row (with its id, for remove()) while there are at most SCATTER_POINT_LIMIT; None after that.
+        self.points = {"id": [], x: [], y: [], label: []}
+        # Distinct pairs so far as x + iy (sorts by x then y), with their counts and the label and id of
+        # their lowest-id row (UNKNOWN_ID after remove() took that row away, until relabel()).
+        self.keys = np.empty(0, dtype=complex)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.labels = np.empty(0, dtype=object)
+        self.label_ids = np.empty(0, dtype=np.int64)
+
+    def pairs(self, df):
+        df = df.dropna(subset=[self.x, self.y])
+        labels = np.empty(len(df), dtype=object)
+        labels[:] = df[self.label].tolist()
+        return (df[self.x].to_numpy(dtype=float) + 1j * df[self.y].to_numpy(dtype=float), labels,
+                df["id"].to_numpy(dtype=np.int64))
+
+    def merge(self, keys, counts, labels, ids):
+        # Lowest id first within each pair, so return_index picks that row's label.
+        order = np.lexsort((ids, keys.imag, keys.real))
+        self.keys, first, inverse = np.unique(keys[order], return_index=True, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts[order], minlength=len(self.keys)).astype(np.int64)
+        self.labels, self.label_ids = labels[order][first], ids[order][first]
+
+    def add(self, df):
+        self.rows += len(df)
+        if self.points is not None and self.rows > SCATTER_POINT_LIMIT:
+            self.points = None
+        if self.points is not None:
+            for col in self.points:
+                self.points[col].extend(df[col].tolist())
+        keys, labels, ids = self.pairs(df)
+        self.merge(np.concatenate([self.keys, keys]), np.concatenate([self.counts, np.ones(len(keys), dtype=np.int64)]),
+                   np.concatenate([self.labels, labels]), np.concatenate([self.label_ids, ids]))
+
+    def remove(self, df):
+        """Take rows that were added before out again; see relabel() for what this can leave unknown."""
+        self.rows -= len(df)
+        removed = set(df["id"].tolist())
+        if self.points is not None:
+            keep = [i for i, pokemon_id in enumerate(self.points["id"]) if pokemon_id not in removed]
+            self.points = {col: [values[i] for i in keep] for col, values in self.points.items()}
+        keys, _, ids = self.pairs(df)
+        np.subtract.at(self.counts, np.searchsorted(self.keys, keys), 1)
+        gone = np.isin(self.label_ids, ids)
+        self.labels[gone], self.label_ids[gone] = None, UNKNOWN_ID
+        live = self.counts > 0
+        self.keys, self.counts, self.labels, self.label_ids = (self.keys[live], self.counts[live], self.labels[live],
+                                                               self.label_ids[live])
+
+    def relabel(self, store):
+        """Fill in from `store` (an ArrowStore of the rows now counted) what remove() could not keep:
+        the label of a pair whose lowest-id row went, and the rows themselves once there are few again.
+
+        Only the x and y columns are scanned, and only matching rows are read.
+        """
+        columns = ["id", self.x, self.y, self.label]
+        if self.points is None and self.rows <= SCATTER_POINT_LIMIT:
+            self.points = store.table.select(columns).to_pandas().to_dict("list")
+        unknown = self.keys[self.label_ids == UNKNOWN_ID]
+        if not len(unknown):
+            return
+        (starts, xs), (_, ys) = store.chunks(self.x), store.chunks(self.y)
+        positions = np.concatenate([np.empty(0, dtype=np.int64)] + [
+            np.flatnonzero(np.isin(x + 1j * y.astype(float), unknown)) + start for start, x, y in zip(starts, xs, ys)])
+        keys, labels, ids = self.pairs(store.table.take(positions).select(columns).to_pandas())
+        self.merge(np.concatenate([self.keys, keys]), np.concatenate([self.counts, np.zeros(len(keys), dtype=np.int64)]),
+                   np.concatenate([self.labels, labels]), np.concatenate([self.label_ids, ids]))
+
+    def result(self):
+        x, y, label = self.x, self.y, self.label
+        if self.rows <= SCATTER_POINT_LIMIT:
+            order = np.argsort(self.points["id"], kind="stable").tolist()
+            return {col: [self.points[col][i] for i in order] for col in (x, y, label)}
+        xs, ys, counts = self.keys.real, self.keys.imag, self.counts
+        if len(self.keys) <= SCATTER_POINT_LIMIT:
+            return {x: xs.tolist(), y: ys.tolist(), label: self.labels.tolist(), "count": counts.tolist()}
+        grid, x_edges, y_edges = np.histogram2d(xs, ys, bins=SCATTER_DENSITY_BINS, weights=counts)
+        ix, iy = np.nonzero(grid)
+        return {x: ((x_edges[ix] + x_edges[ix + 1]) / 2).tolist(), y: ((y_edges[iy] + y_edges[iy + 1]) / 2).tolist(),
+                "count": grid[ix, iy].astype(int).tolist()}
+
+    def state(self):
+        return {"rows": self.rows, "points": self.points, "keys": [self.keys.real.tolist(), self.keys.imag.tolist()],
+                "counts": self.counts.tolist(), "labels": self.labels.tolist(), "label_ids": self.label_ids.tolist()}
+
+    @classmethod
+    def from_state(cls, x, y, state, label="name"):
+        points = cls(x, y, label)
+        points.rows, points.points = state["rows"], state["points"]
+        points.keys = np.array(state["keys"][0], dtype=float) + 1j * np.array(state["keys"][1], dtype=float)
+        points.counts = np.array(state["counts"], dtype=np.int64)
+        points.labels = np.empty(len(points.keys), dtype=object)
+        points.labels[:] = state["labels"]
+        points.label_ids = np.array(state["label_ids"], dtype=np.int64)
+        return points
+
+def scatter_points(df, x, y, label="name"):
+    points = ScatterAccumulator(x, y, label)
+    points.add(df)
+    return points.result()
+
+class AggregateAccumulator:
+    """compute_aggregates() fed a chunk at a time, for clean_stream(), and updated in place by clean_incremental().
+
+    Type and stat columns are kept as counts per distinct value (the stats are
+    small integers), so the histograms and percentiles come out exactly as
+    from the whole column while memory stays independent of the row count.
+    The counts are saved in the manifest (state()), and remove() subtracts
+    rows from them again.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        # type -> [rows, lowest id]; the lowest id breaks ties in the type donut (first appearance in id order).
+        self.type_counts = {}
+        self.stat_counts = {stat: {} for stat in STAT_COLUMNS}
+        self.happiness = ScatterAccumulator("hatch_counter", "base_happiness")
+
+    def type_groups(self, df):
+        df = df.dropna(subset=["type_1"])
+        groups = df.groupby(df["type_1"].astype(str), sort=False)["id"].agg(["size", "min"])
+        return [(label, int(count), int(first)) for label, count, first in groups.itertuples()]
+
+    def add(self, df):
+        self.rows += len(df)
+        for label, count, first in self.type_groups(df):
+            counts = self.type_counts.setdefault(label, [0, first])
+            counts[0] += count
+            counts[1] = first if counts[1] is None else min(counts[1], first)
+        for stat, counts in self.stat_counts.items():
+            for value, count in df[stat].dropna().astype(float).value_counts(sort=False).items():
+                counts[value] = counts.get(value, 0) + count
+        self.happiness.add(df)
+
+    def remove(self, df):
+        """Subtract rows that were added before; call relabel() before result() afterwards."""
+        self.rows -= len(df)
+        for label, count, first in self.type_groups(df):
+            counts = self.type_counts[label]
+            counts[0] -= count
+            if counts[0] == 0:
+                del self.type_counts[label]
+            elif counts[1] == first:
+                counts[1] = None
+        for stat, counts in self.stat_counts.items():
+            for value, count in df[stat].dropna().astype(float).value_counts(sort=False).items():
+                counts[value] -= count
+                if counts[value] == 0:
+                    del counts[value]
+        self.happiness.remove(df)
+
+    def relabel(self, store):
+        """Look up in `store` (an ArrowStore of the rows now counted) the lowest ids and labels remove() took away."""
+        import pyarrow.compute as pc
+
+        for label, counts in self.type_counts.items():
+            if counts[1] is None:
+                counts[1] = pc.min(pc.filter(store.table.column("id"),
+                                             pc.equal(store.table.column("type_1"), label))).as_py()
+        self.happiness.relabel(store)
+
+    def result(self):
+        type_counts = sorted(((label, count, first) for label, (count, first) in self.type_counts.items()),
+                             key=lambda item: (-item[1], item[2]))
+        stats = {}
+        for stat, value_counts in self.stat_counts.items():
+            values = np.array(sorted(value_counts), dtype=float)
+            counts = np.array([value_counts[value] for value in values.tolist()], dtype=np.int64)
+            bin_counts, edges = np.histogram(values, bins=HISTOGRAM_BINS, weights=counts)
+            stats[stat] = {
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "percentiles": dict(zip(map(str, PERCENTILES),
+                                        percentiles_from_counts(values, counts, PERCENTILES).tolist())),
+                "bin_edges": edges.tolist(),
+                "bin_counts": bin_counts.astype(np.int64).tolist(),
+            }
+        return {
+            "rows": self.rows,
+            "type_counts": {"labels": [label for label, _, _ in type_counts],
+                            "counts": [int(count) for _, count, _ in type_counts]},
+            "stats": stats,
+            "happiness": self.happiness.result(),
+        }
+
+    def state(self):
+        return {"rows": self.rows, "type_counts": self.type_counts,
+                "stat_counts": {stat: [[value, int(count)] for value, count in counts.items()]
+                                for stat, counts in self.stat_counts.items()},
+                "happiness": self.happiness.state()}
 
-df["gender_distribution"] = df["gender_rate"].apply(gender_label)
+    @classmethod
+    def from_state(cls, state):
+        aggregates = cls()
+        aggregates.rows = state["rows"]
+        aggregates.type_counts = state["type_counts"]
+        aggregates.stat_counts = {stat: {value: count for value, count in counts}
+                                  for stat, counts in state["stat_counts"].items()}
+        aggregates.happiness = ScatterAccumulator.from_state("hatch_counter", "base_happiness", state["happiness"])
+        return aggregates
 
-df["egg_groups"] = df["egg_groups"].fillna("")
+def compute_aggregates(df):
+    """Everything the dashboard's global views need, so it never re-scans whole columns per request."""
+    aggregates = AggregateAccumulator()
+    aggregates.add(df)
+    return aggregates.result()
 
-df["base_happiness"] = df["base_happiness"].fillna(0).astype(int)
-df["hatch_counter"] = df["hatch_counter"].fillna(0).astype(int)
+def save_aggregates(aggregates, data_paths, aggregates_path=AGGREGATES_PATH):
+    # The signatures of the files the aggregates were computed from; the app
+    # only trusts the sidecar while the data file it loaded still matches.
+    aggregates["sources"] = {os.path.basename(path): file_signature(path) for path in data_paths}
+    with open(aggregates_path, "w") as f:
+        json.dump(aggregates, f)
 
-df["evolution_stage"] = df["evolution_stage"].fillna(1).astype(int)
-df["evolution_chain_id"] = df["evolution_chain_id"].fillna(df["id"]).astype(int)
+def arrow_schema(columns, dictionaries=True):
+    """Arrow equivalent of COMPACT_DTYPES, fixed up front so every chunk writes the same schema.
 
-df.to_csv(SAVE_PATH, index=False)
-print(f" Cleaned and saved to {SAVE_PATH}")
+    With `dictionaries=False` the categorical columns are plain strings, which
+    keeps the memory-mapped IPC file directly usable without decoding.
+    """
+    import pyarrow as pa
+
+    types = {
+        "uint8": pa.uint8(), "uint16": pa.uint16(), "UInt16": pa.uint16(), "uint32": pa.uint32(), "int8": pa.int8(),
+        "float32": pa.float32(), "bool": pa.bool_(),
+        "category": pa.dictionary(pa.int32(), pa.string()) if dictionaries else pa.string(),
+    }
+    return pa.schema([(col, types[COMPACT_DTYPES[col]] if col in COMPACT_DTYPES else pa.string())
+                      for col in columns])
+
+def record_hash(record):
+    # Of the record as fetch_data1.py writes it on a JSONL line, so --incremental
+    # can hash the lines it reads without parsing them.
+    return line_hash(json.dumps(record).encode("utf-8"))
+
+def line_hash(line):
+    return hashlib.sha1(line.rstrip(b"\r\n")).hexdigest()
+
+def cleaner_signature():
+    return hashlib.sha1(json.dumps([CLEANER_VERSION, COMPACT_DTYPES], sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def source_signature(load_path):
+    return {os.path.basename(load_path): file_signature(load_path)}
+
+def save_manifest(hashes, aggregates, load_path, manifest_path=MANIFEST_PATH):
+    """Record hashes by id, plus what --incremental needs to update the outputs without re-reading them:
+    the raw file they were cleaned from and the AggregateAccumulator's state()."""
+    # dumps() rather than dump(): only the one-shot encoder runs in C, which matters at one entry per record.
+    with open(manifest_path, "w") as f:
+        f.write(json.dumps({"cleaner": cleaner_signature(), "source": source_signature(load_path),
+                            "aggregates": aggregates, "records": hashes}, sort_keys=True))
+
+def clean_all(load_path=LOAD_PATH, save_path=SAVE_PATH, parquet_path=PARQUET_PATH, manifest_path=MANIFEST_PATH,
+              aggregates_path=AGGREGATES_PATH, arrow_path=ARROW_PATH):
+    with open(load_path) as f:
+        data = json.load(f)
+
+    aggregates = save(clean(data), save_path, parquet_path, aggregates_path, arrow_path)
+    save_manifest({str(record["id"]): record_hash(record) for record in data}, aggregates.state(), load_path,
+                  manifest_path)
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Records of a JSONL file, `chunk_size` at a time.
+
+    A last line cut off mid-record, as an interrupted append leaves it, is
+    skipped with a warning; anything else that does not parse still fails.
+    """
+    with open(path) as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+            records = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Only the last line of the file can lack its newline.
+                    if line.endswith("\n"):
+                        raise
+                    print(f" Skipping a torn last line in {path}")
+            if records:
+                yield records
+
+def clean_stream(load_path=STREAM_LOAD_PATH, save_path=SAVE_PATH, parquet_path=PARQUET_PATH,
+                 chunk_size=CHUNK_SIZE, aggregates_path=AGGREGATES_PATH, arrow_path=ARROW_PATH,
+                 manifest_path=MANIFEST_PATH):
+    """Clean a JSONL file of raw records `chunk_size` records at a time.
+
+    Each chunk goes through the same clean() as a full run and is appended to
+    the CSV and written as one Parquet row group and one Arrow IPC record
+    batch, so memory use depends on the chunk size rather than on the size
+    of the input. The aggregates are accumulated chunk by chunk and come out
+    the same as from a full clean. The manifest is written a chunk at a time
+    as well, and the old one is removed first so an interrupted run leaves none.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    arrow_writer = None
+    arrow_file_schema = None
+    columns = None
+    rows = 0
+    aggregates = AggregateAccumulator()
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = open(manifest_path + ".tmp", "w")
+    manifest.write('{"cleaner": %s, "records": {' % json.dumps(cleaner_signature()))
+    try:
+        for records in iter_chunks(load_path, chunk_size):
+            manifest.write("".join(f'{"," if rows or n else ""}\n{json.dumps(str(record["id"]))}: '
+                                   f'{json.dumps(record_hash(record))}' for n, record in enumerate(records)))
+            df = clean(records)
+            if writer is None:
+                columns = list(df.columns)
+                writer = pq.ParquetWriter(parquet_path, arrow_schema(columns))
+                arrow_file_schema = arrow_schema(columns, dictionaries=False)
+                arrow_writer = pa.ipc.new_file(arrow_path + ".tmp", arrow_file_schema)
+                write_csv(df, save_path)
+            else:
+                df = df[columns]
+                write_csv(df, save_path, mode="a", header=False)
+            aggregates.add(df)
+            writer.write_table(pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False))
+            arrow_writer.write_table(pa.Table.from_pandas(df, schema=arrow_file_schema, preserve_index=False))
+            rows += len(df)
+    finally:
+        manifest.close()
+        if writer is not None:
+            writer.close()
+            arrow_writer.close()
+    if arrow_writer is not None:
+        # Like save_arrow(): only a complete file replaces the one the dashboard maps.
+        # ArrowStore reads its record batches in place, one per chunk.
+        os.replace(arrow_path + ".tmp", arrow_path)
+    with open(manifest_path + ".tmp", "a") as f:
+        f.write('\n}, "source": %s, "aggregates": %s}\n' % (json.dumps(source_signature(load_path)),
+                                                           json.dumps(aggregates.state())))
+    os.replace(manifest_path + ".tmp", manifest_path)
+    save_aggregates(aggregates.result(), [save_path, parquet_path, arrow_path], aggregates_path)
+    print(f" Cleaned {rows} records in chunks of {chunk_size} and saved to {save_path}, {parquet_path}, "
+          f"{arrow_path} and {aggregates_path}")
+
+def batch_targets(first_ids, ids, in_order):
+    """Index of the batch (or row group) each of the sorted `ids` merges into: the last one starting at or
+    below it when the file is in id order, otherwise the last one."""
+    if not in_order:
+        return np.full(len(ids), max(len(first_ids) - 1, 0))
+    return np.maximum(np.searchsorted(first_ids, ids, side="right") - 1, 0)
+
+def merge_batch(table, stale, new, in_order):
+    """`table` without the `stale` ids and with the `new` rows, kept in id order if it was."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = table.filter(pc.invert(pc.is_in(table.column("id"), pa.array(stale, table.schema.field("id").type))))
+    table = pa.concat_tables([table, new]).unify_dictionaries()
+    return table.sort_by("id") if in_order else table
+
+def update_csv(save_path, new, stale, last_id):
+    """Merge the cleaned `new` rows (sorted by id) into the CSV in place of the `stale` ids.
+
+    Appends when only records past `last_id` were added; otherwise the file is
+    copied line by line (one record per line: no field holds a newline), with
+    each new row written before the first line with a higher id.
+    """
+    if not len(stale) and (not len(new) or new["id"].iloc[0] > last_id):
+        write_csv(new, save_path, mode="a", header=False)
+        return
+    lines = write_csv(new, None, header=False).splitlines(keepends=True)
+    new_ids = new["id"].tolist()
+    stale = set(stale)
+    with open(save_path, newline="") as src, open(save_path + ".tmp", "w", newline="") as out:
+        out.write(src.readline())
+        k = 0
+        for line in src:
+            pokemon_id = int(line.split(",", 1)[0])
+            while k < len(new_ids) and new_ids[k] < pokemon_id:
+                out.write(lines[k])
+                k += 1
+            if pokemon_id in stale:
+                stale.remove(pokemon_id)
+            else:
+                out.write(line)
+            if not stale and k == len(new_ids):
+                # Nothing left to merge: the rest is copied without looking at it.
+                shutil.copyfileobj(src, out)
+        out.writelines(lines[k:])
+    os.replace(save_path + ".tmp", save_path)
+
+def update_parquet(parquet_path, new, stale):
+    """Rewrite the Parquet file one row group at a time, merging the `new` rows (a DataFrame sorted by id).
+
+    Parquet has no way to copy a row group without decoding it, but only one
+    row group is in memory at a time and it never goes through pandas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    source = pq.ParquetFile(parquet_path)
+    schema = source.schema_arrow
+    new = pa.Table.from_pandas(new, schema=schema, preserve_index=False)
+    # The row groups' id ranges, from the footer statistics.
+    id_column = source.schema_arrow.get_field_index("id")
+    ranges = [source.metadata.row_group(i).column(id_column).statistics for i in range(source.num_row_groups)]
+    in_order = all(stats is not None and stats.has_min_max for stats in ranges) and all(
+        a.max < b.min for a, b in zip(ranges, ranges[1:]))
+    targets = batch_targets([stats.min if in_order else None for stats in ranges], new.column("id").to_numpy(),
+                            in_order)
+    with pq.ParquetWriter(parquet_path + ".tmp", schema) as writer:
+        for i in range(source.num_row_groups):
+            writer.write_table(merge_batch(source.read_row_group(i), stale, new.take(np.flatnonzero(targets == i)),
+                                           in_order))
+        if not source.num_row_groups:
+            writer.write_table(new)
+    os.replace(parquet_path + ".tmp", parquet_path)
+
+def update_arrow(arrow_path, store, new, stale):
+    """Rewrite the Arrow file from the mapped `store`: record batches without a stale id or a new row are copied
+    as they are, and the others rebuilt with merge_batch()."""
+    import pyarrow as pa
+
+    schema = store.table.schema
+    new = pa.Table.from_pandas(new, schema=schema, preserve_index=False)
+    batches = [batch for batch in store.table.to_batches() if batch.num_rows]
+    first_ids = np.array([batch.column("id")[0].as_py() for batch in batches])
+    targets = batch_targets(first_ids, new.column("id").to_numpy(), store.order is None)
+    stale_ids = np.asarray(stale)
+    with pa.OSFile(arrow_path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for i, batch in enumerate(batches):
+            mine = np.flatnonzero(targets == i)
+            if not len(mine) and not np.isin(to_numpy(batch.column("id")), stale_ids).any():
+                writer.write_batch(batch)
+            else:
+                merged = merge_batch(pa.Table.from_batches([batch]), stale, new.take(mine), store.order is None)
+                writer.write_table(merged.combine_chunks())
+        if not batches:
+            writer.write_table(new)
+    os.replace(arrow_path + ".tmp", arrow_path)
+
+def clean_incremental(load_path=STREAM_LOAD_PATH, save_path=SAVE_PATH, parquet_path=PARQUET_PATH,
+                      manifest_path=MANIFEST_PATH, aggregates_path=AGGREGATES_PATH, arrow_path=ARROW_PATH):
+    """Bring the cleaned files up to date with a JSONL file of raw records, in time that follows the size of the change.
+
+    The raw lines are hashed without being parsed; only lines whose hash is
+    not in the manifest are parsed and go through clean(), and ids whose
+    hash no longer appears are dropped. The rows are merged into the
+    existing outputs (see update_csv, update_parquet and update_arrow), and
+    the aggregates are updated from the counts kept in the manifest: the old
+    rows are subtracted and the new ones added. An unchanged raw file is
+    recognised from its size and mtime alone. Falls back to clean_stream()
+    when there is no previous clean to update, or it was made by another
+    cleaner version.
+    """
+    def clean_everything(reason):
+        print(f" {reason}, cleaning everything")
+        return clean_stream(load_path, save_path, parquet_path, aggregates_path=aggregates_path,
+                            arrow_path=arrow_path, manifest_path=manifest_path)
+
+    manifest = load_manifest(manifest_path)
+    if not manifest or not all(os.path.exists(path) for path in (save_path, parquet_path, arrow_path)):
+        return clean_everything("No previous clean to update")
+    if manifest.get("cleaner") != cleaner_signature():
+        return clean_everything("Previous clean was made by a different cleaner version")
+    if manifest["source"] == source_signature(load_path):
+        print(f" {load_path} unchanged since the last clean, nothing to do")
+        return
+
+    hashes = manifest["records"]
+    known = set(hashes.values())
+    seen = set()
+    records = []
+    with open(load_path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            digest = line_hash(line)
+            seen.add(digest)
+            if digest in known:
+                continue
+            try:
+                records.append((digest, json.loads(line)))
+            except ValueError:
+                # As in iter_chunks(): only a torn last line is skipped.
+                if line.endswith(b"\n"):
+                    raise
+                print(f" Skipping a torn last line in {load_path}")
+    stale = sorted(int(pokemon_id) for pokemon_id, digest in hashes.items() if digest not in seen)
+    changed = len(set(stale) & {record["id"] for _, record in records})
+
+    store = ArrowStore.open(arrow_path)
+    if records:
+        new = clean([record for _, record in records])
+        if set(new.columns) != set(store.table.column_names):
+            return clean_everything("Cleaned columns differ from the previous clean")
+        new = new[store.table.column_names].sort_values("id", ignore_index=True)
+    else:
+        new = pd.DataFrame(columns=store.table.column_names)
+    if records or stale:
+        positions = [store.position(pokemon_id) for pokemon_id in stale]
+        old = store.table.take(np.array([pos for pos in positions if pos is not None], dtype=np.int64)).to_pandas()
+        last_id = max((int(chunk.max()) for chunk in store.chunks("id")[1]), default=-1)
+        update_csv(save_path, new, stale, last_id)
+        update_parquet(parquet_path, new, stale)
+        update_arrow(arrow_path, store, new, stale)
+        del store
+
+        aggregates = AggregateAccumulator.from_state(manifest["aggregates"])
+        aggregates.remove(old)
+        aggregates.add(new)
+        aggregates.relabel(ArrowStore.open(arrow_path))
+        save_aggregates(aggregates.result(), [save_path, parquet_path, arrow_path], aggregates_path)
+        manifest["aggregates"] = aggregates.state()
+
+    for pokemon_id in stale:
+        del hashes[str(pokemon_id)]
+    hashes.update((str(record["id"]), digest) for digest, record in records)
+    save_manifest(hashes, manifest["aggregates"], load_path, manifest_path)
+    if records or stale:
+        print(f" Re-cleaned {changed} changed records, added {len(records) - changed}, "
+              f"dropped {len(stale) - changed}, kept the other {len(hashes) - len(records)}")
+    else:
+        print(f" {len(hashes)} records unchanged, nothing to do")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean raw Pokémon data into the dashboard's dataset.")
+    parser.add_argument("--incremental", nargs="?", const=STREAM_LOAD_PATH, metavar="JSONL",
+                        help="only re-clean the records of a JSONL file that changed since the last run "
+                             "(same default as --stream)")
+    parser.add_argument("--stream", nargs="?", const=STREAM_LOAD_PATH, metavar="JSONL",
+                        help=f"clean a JSONL file of raw records chunk by chunk (default {STREAM_LOAD_PATH}, "
+                             "written by fetch_data1.py)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="records per chunk in --stream mode")
+    args = parser.parse_args()
+
+    if args.stream:
+        clean_stream(args.stream, chunk_size=args.chunk_size)
+    elif args.incremental:
+        clean_incremental(args.incremental)
+    else:
+        clean_all()
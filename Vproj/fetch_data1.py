@@ -1,13 +1,25 @@
-
 import requests
 import json
-from time import sleep
+from time import sleep, monotonic
 import os
+import asyncio
+import argparse
+from textwrap import indent
+from http_cache import ResponseCache, CACHE_DIR, CACHE_TTL
+from json_projection import project
 
 API_URL = "https://pokeapi.co/api/v2/pokemon/"
 SPECIES_URL = "https://pokeapi.co/api/v2/pokemon-species/"
 MAX_POKEMON = 250
 DATA_FILE = r"C:\Users\kubag\Desktop\Vproj\raw_pokemon.json"
+# The same records one per line, for clean_data1.py --stream.
+DATA_LINES_FILE = r"C:\Users\kubag\Desktop\Vproj\raw_pokemon.records.jsonl"
+EVOLUTIONS_FILE = r"C:\Users\kubag\Desktop\Vproj\raw_evolutions.json"
+STREAM_FILE = r"C:\Users\kubag\Desktop\Vproj\raw_pokemon.jsonl"
+EVOLUTIONS_STREAM_FILE = r"C:\Users\kubag\Desktop\Vproj\raw_evolutions.jsonl"
+
+MAX_CONCURRENCY = 10
+REQUESTS_PER_SECOND = 20
 
 
 def get_evolution_stages(chain, stage=1, mapping=None):
@@ -19,60 +31,349 @@ def get_evolution_stages(chain, stage=1, mapping=None):
         get_evolution_stages(evo, stage + 1, mapping)
     return mapping
 
-def fetch_pokemon():
-    all_pokemon = []
-    for i in range(1, MAX_POKEMON + 1):
-        print(f"Fetching Pokémon ID: {i}")
-        p = requests.get(API_URL + str(i)).json()
-        s = requests.get(SPECIES_URL + str(i)).json()
+def chain_id_from_url(url):
+    return int(url.strip("/").split("/")[-1])
+
+def iter_stream(path):
+    """Yield (offset, record) for every complete line of a JSONL stream.
+
+    Stops at the first torn or unparsable line, which is what an interrupted
+    append leaves behind.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            yield offset, record
+            offset += len(line)
+
+def repair_stream(path):
+    """Truncate a JSONL stream at the end of its last complete record (or to empty if there is none)."""
+    last = None
+    for last, _ in iter_stream(path):
+        pass
+    if os.path.exists(path):
+        with open(path, "rb+") as f:
+            end = 0
+            if last is not None:
+                f.seek(last)
+                f.readline()
+                end = f.tell()
+            f.truncate(end)
+
+def append_record(f, record):
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+
+def load_checkpoint(stream_file=STREAM_FILE):
+    repair_stream(stream_file)
+    done = {record["id"] for _, record in iter_stream(stream_file)}
+    if done:
+        print(f" Resuming: {len(done)} Pokémon already in {stream_file}")
+    return done
+
+
+class EvolutionChainCache:
+    """Evolution chains keyed by evolution_chain_id, so each family is downloaded once per run.
+
+    Raw chains are appended to `stream_file` as they arrive and reloaded from
+    it on restart.
+    """
+
+    def __init__(self, stream_file=EVOLUTIONS_STREAM_FILE):
+        self.stream_file = stream_file
+        self.stages = {}
+        self.pending = {}
+        repair_stream(stream_file)
+        for _, entry in iter_stream(stream_file):
+            self.stages[chain_id_from_url(entry["url"])] = get_evolution_stages(entry["chain"]["chain"])
+
+    def add(self, url, chain_data):
+        chain_id = chain_id_from_url(url)
+        self.stages[chain_id] = get_evolution_stages(chain_data["chain"])
+        with open(self.stream_file, "a") as f:
+            append_record(f, {"url": url, "chain": chain_data})
+        return self.stages[chain_id]
+
+    def get(self, url, fetch_json):
+        chain_id = chain_id_from_url(url)
+        if chain_id not in self.stages:
+            self.add(url, fetch_json(url))
+        return self.stages[chain_id]
+
+    async def get_async(self, url, fetch_json):
+        chain_id = chain_id_from_url(url)
+        if chain_id in self.stages:
+            return self.stages[chain_id]
+        if chain_id not in self.pending:
+            self.pending[chain_id] = asyncio.ensure_future(fetch_json(url))
+        try:
+            chain_data = await self.pending[chain_id]
+        except Exception:
+            self.pending.pop(chain_id, None)
+            raise
+        if chain_id not in self.stages:
+            self.add(url, chain_data)
+        return self.stages[chain_id]
+
+# The parts of each payload build_record() reads; everything else is skipped when parsing.
+POKEMON_FIELDS = {
+    'id': True, 'name': True, 'base_experience': True, 'height': True, 'weight': True,
+    'types': True, 'stats': True, 'abilities': True,
+    'sprites': {'other': {'official-artwork': True}},
+}
+SPECIES_FIELDS = {
+    'gender_rate': True, 'capture_rate': True, 'is_legendary': True, 'base_happiness': True,
+    'hatch_counter': True, 'egg_groups': True, 'evolution_chain': True,
+}
+
+def parse_payload(text, fields=None):
+    return json.loads(text) if fields is None else project(text, fields)
+
+def build_record(p, s, evolution_chain_id, evo_stage):
+    types = [t['type']['name'] for t in p['types']]
+    stats = {st['stat']['name']: st['base_stat'] for st in p['stats']}
+
+    return {
+        'id': p['id'],
+        'name': p['name'],
+        'base_experience': p['base_experience'],
+        'height': p['height'],
+        'weight': p['weight'],
+        'type_1': types[0] if len(types) > 0 else None,
+        'type_2': types[1] if len(types) > 1 else None,
+        'hp': stats['hp'],
+        'attack': stats['attack'],
+        'defense': stats['defense'],
+        'special-attack': stats['special-attack'],
+        'special-defense': stats['special-defense'],
+        'speed': stats['speed'],
+        'abilities': ', '.join([a['ability']['name'] for a in p['abilities']]),
+        'sprite_url': p['sprites']['other']['official-artwork']['front_default'],
+        'gender_rate': s['gender_rate'],
+        'capture_rate': s['capture_rate'],
+        'is_legendary': s['is_legendary'],
+        'base_happiness': s['base_happiness'],
+        'hatch_counter': s['hatch_counter'],
+        'egg_groups': ', '.join([eg['name'] for eg in s['egg_groups']]),
+        'evolution_chain_id': evolution_chain_id,
+        'evolution_stage': evo_stage
+    }
+
+def finalize(stream_file=STREAM_FILE, data_file=DATA_FILE,
+             evolutions_stream_file=EVOLUTIONS_STREAM_FILE, evolutions_file=EVOLUTIONS_FILE,
+             data_lines_file=DATA_LINES_FILE):
+    """Write the streamed records out as the JSON array file the cleaner reads, and as JSONL for --stream.
+
+    Records are sorted by id and copied one at a time from the stream, so only
+    their offsets are held in memory. Unlike the stream, which is a checkpoint
+    deleted after a successful run, both outputs are kept.
+    """
+    offsets = {}
+    for offset, record in iter_stream(stream_file):
+        offsets[record["id"]] = offset
+
+    with open(stream_file, "rb") as src, open(data_file, "w") as out, open(data_lines_file, "w") as lines:
+        out.write("[")
+        for n, pokemon_id in enumerate(sorted(offsets)):
+            src.seek(offsets[pokemon_id])
+            record = json.loads(src.readline())
+            out.write(("," if n else "") + "\n" + indent(json.dumps(record, indent=2), "  "))
+            lines.write(json.dumps(record) + "\n")
+        out.write("\n]" if offsets else "]")
+    print(f" Saved {len(offsets)} pokemon to {data_file} and {data_lines_file}")
+
+    chains = {entry["url"]: entry["chain"] for _, entry in iter_stream(evolutions_stream_file)}
+    with open(evolutions_file, "w") as f:
+        json.dump(chains, f, indent=2)
+    print(f" Saved {len(chains)} evolution chains to {evolutions_file}")
+
+def clear_streams(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def fetch_pokemon(cache=None):
+    done = load_checkpoint(STREAM_FILE)
+    chain_cache = EvolutionChainCache(EVOLUTIONS_STREAM_FILE)
+    session = requests.Session()
 
-        types = [t['type']['name'] for t in p['types']]
-        stats = {s['stat']['name']: s['base_stat'] for s in p['stats']}
+    def get_json(url, fields=None):
+        text = session.get(url).text if cache is None else cache.get_text(session, url)
+        return parse_payload(text, fields)
+
+    failed = []
+    with open(STREAM_FILE, "a") as out:
+        for i in range(1, MAX_POKEMON + 1):
+            if i in done:
+                continue
+            print(f"Fetching Pokémon ID: {i}")
+            downloads_before = cache.downloads if cache else None
+            p = get_json(API_URL + str(i), POKEMON_FIELDS)
+            s = get_json(SPECIES_URL + str(i), SPECIES_FIELDS)
+
+            evolution_chain_url = s.get("evolution_chain", {}).get("url", "")
+            evolution_chain_id = None
+            evo_stage = 1
+
+            if evolution_chain_url:
+                # No record without its chain: a checkpointed stage-1 guess
+                # would never be fetched again, so the ID is retried next run.
+                try:
+                    evolution_chain_id = chain_id_from_url(evolution_chain_url)
+                    evo_map = chain_cache.get(evolution_chain_url, get_json)
+                    evo_stage = evo_map.get(p["name"], 1)
+                except Exception as e:
+                    print(f" Evolution chain for ID {i} failed: {e!r}")
+                    failed.append(i)
+                    continue
+
+            append_record(out, build_record(p, s, evolution_chain_id, evo_stage))
+
+            # Fresh hits and 304 revalidations skip the pause: only a downloaded body costs the API much.
+            if cache is None or cache.downloads != downloads_before:
+                sleep(0.5)
+
+    if cache is not None:
+        cache.report()
+    if failed:
+        print(f" {len(failed)} Pokémon failed (first: ID {failed[0]}); re-run to resume from {STREAM_FILE}")
+        return failed
+
+    finalize()
+    clear_streams(STREAM_FILE, EVOLUTIONS_STREAM_FILE)
+    return failed
+
+
+class TokenBucket:
+    """Async rate limiter: allows `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self.lock:
+            while True:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def fetch_pokemon_async(api_url=API_URL, species_url=SPECIES_URL, max_pokemon=MAX_POKEMON,
+                              data_file=DATA_FILE, evolutions_file=EVOLUTIONS_FILE, data_lines_file=DATA_LINES_FILE,
+                              stream_file=STREAM_FILE, evolutions_stream_file=EVOLUTIONS_STREAM_FILE,
+                              max_concurrency=MAX_CONCURRENCY,
+                              requests_per_second=REQUESTS_PER_SECOND, cache=None):
+    """Same output as fetch_pokemon(), but requests run concurrently.
+
+    At most `max_concurrency` requests are in flight at once and no more than
+    `requests_per_second` are started per second (0 disables the limit).
+    Fresh entries in `cache` are served without spending a rate-limit token.
+    Records are streamed to `stream_file` as they complete; IDs already there
+    are skipped, and the output files are only written once every ID
+    has been fetched.
+    """
+    done = load_checkpoint(stream_file)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    chain_cache = EvolutionChainCache(evolutions_stream_file)
+    bucket = TokenBucket(requests_per_second)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    async def get_json(url, fields=None):
+        text = cache.get_fresh(url) if cache is not None else None
+        if text is None:
+            await bucket.acquire()
+            async with semaphore:
+                if cache is not None:
+                    text = await asyncio.to_thread(cache.get_text, session, url)
+                else:
+                    response = await asyncio.to_thread(session.get, url)
+                    text = response.text
+        return parse_payload(text, fields)
+
+    async def fetch_one(i):
+        print(f"Fetching Pokémon ID: {i}")
+        p, s = await asyncio.gather(get_json(api_url + str(i), POKEMON_FIELDS),
+                                    get_json(species_url + str(i), SPECIES_FIELDS))
 
         evolution_chain_url = s.get("evolution_chain", {}).get("url", "")
         evolution_chain_id = None
         evo_stage = 1
 
         if evolution_chain_url:
-            try:
-                evolution_chain_id = int(evolution_chain_url.strip("/").split("/")[-1])
-                chain_data = requests.get(evolution_chain_url).json()
-                evo_map = get_evolution_stages(chain_data["chain"])
-                evo_stage = evo_map.get(p["name"], 1)
-            except:
-                evo_stage = 1
-
-        all_pokemon.append({
-            'id': p['id'],
-            'name': p['name'],
-            'base_experience': p['base_experience'],
-            'height': p['height'],
-            'weight': p['weight'],
-            'type_1': types[0] if len(types) > 0 else None,
-            'type_2': types[1] if len(types) > 1 else None,
-            'hp': stats['hp'],
-            'attack': stats['attack'],
-            'defense': stats['defense'],
-            'special-attack': stats['special-attack'],
-            'special-defense': stats['special-defense'],
-            'speed': stats['speed'],
-            'abilities': ', '.join([a['ability']['name'] for a in p['abilities']]),
-            'sprite_url': p['sprites']['other']['official-artwork']['front_default'],
-            'gender_rate': s['gender_rate'],
-            'capture_rate': s['capture_rate'],
-            'is_legendary': s['is_legendary'],
-            'base_happiness': s['base_happiness'],
-            'hatch_counter': s['hatch_counter'],
-            'egg_groups': ', '.join([eg['name'] for eg in s['egg_groups']]),
-            'evolution_chain_id': evolution_chain_id,
-            'evolution_stage': evo_stage
-        })
-
-        sleep(0.5)
-
-    with open(DATA_FILE, "w") as f:
-        json.dump(all_pokemon, f, indent=2)
-    print(f" Saved {len(all_pokemon)} pokemon to {DATA_FILE}")
+            # A failed chain fails the ID (no stage-1 guess in the checkpoint), so the next run retries it.
+            evolution_chain_id = chain_id_from_url(evolution_chain_url)
+            evo_map = await chain_cache.get_async(evolution_chain_url, get_json)
+            evo_stage = evo_map.get(p["name"], 1)
+
+        append_record(out, build_record(p, s, evolution_chain_id, evo_stage))
+
+    todo = [i for i in range(1, max_pokemon + 1) if i not in done]
+    with session, open(stream_file, "a") as out:
+        results = await asyncio.gather(*(fetch_one(i) for i in todo), return_exceptions=True)
+
+    if cache is not None:
+        cache.report()
+    failed = [i for i, result in zip(todo, results) if isinstance(result, Exception)]
+    if failed:
+        print(f" {len(failed)} Pokémon failed (first: ID {failed[0]}: {results[todo.index(failed[0])]!r}); "
+              f"re-run to resume from {stream_file}")
+        return failed
+
+    finalize(stream_file, data_file, evolutions_stream_file, evolutions_file, data_lines_file)
+    clear_streams(stream_file, evolutions_stream_file)
+    return failed
+
 
 if __name__ == "__main__":
-    fetch_pokemon()
+    parser = argparse.ArgumentParser(description="Fetch Pokémon data from the PokeAPI.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="fetch concurrently instead of one ID at a time")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY,
+                        help="maximum requests in flight (async mode)")
+    parser.add_argument("--rps", type=float, default=REQUESTS_PER_SECOND,
+                        help="maximum requests started per second, 0 for no limit (async mode)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"always download, bypassing the response cache in {CACHE_DIR}")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL,
+                        help="seconds a cached response is used before it is revalidated")
+    parser.add_argument("--fresh", action="store_true",
+                        help=f"discard a partial run in {STREAM_FILE} instead of resuming it")
+    parser.add_argument("--finalize", action="store_true",
+                        help="only convert the records streamed so far into the JSON output files")
+    args = parser.parse_args()
+
+    if args.finalize:
+        finalize()
+        raise SystemExit
+    if args.fresh:
+        clear_streams(STREAM_FILE, EVOLUTIONS_STREAM_FILE)
+
+    cache = None if args.no_cache else ResponseCache(ttl=args.cache_ttl)
+    if args.use_async:
+        failed = asyncio.run(fetch_pokemon_async(max_concurrency=args.concurrency,
+                                                 requests_per_second=args.rps, cache=cache))
+    else:
+        failed = fetch_pokemon(cache)
+    if failed:
+        raise SystemExit(1)
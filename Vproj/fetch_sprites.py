@@ -0,0 +1,59 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+DATA_FILE = r"C:\Users\kubag\Desktop\Vproj\raw_pokemon.json"
+SPRITE_DIR = r"C:\Users\kubag\Desktop\Vproj\sprites"
+
+# 70px evolution tree, 100px gallery, 200px detail and comparison views.
+THUMBNAIL_SIZES = (70, 100, 200)
+THUMBNAIL_FORMAT = "webp"
+MAX_WORKERS = 8
+
+
+def thumbnail_name(pokemon_id, size):
+    return f"{pokemon_id}_{size}.{THUMBNAIL_FORMAT}"
+
+def mirror_sprite(session, pokemon_id, url, sprite_dir=SPRITE_DIR):
+    """Download one official-artwork PNG (once) and write any missing thumbnails."""
+    original = os.path.join(sprite_dir, f"{pokemon_id}.png")
+    if not os.path.exists(original):
+        response = session.get(url)
+        response.raise_for_status()
+        with open(original + ".tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(original + ".tmp", original)
+
+    with Image.open(original) as img:
+        img = img.convert("RGBA")
+        for size in THUMBNAIL_SIZES:
+            path = os.path.join(sprite_dir, thumbnail_name(pokemon_id, size))
+            if os.path.exists(path):
+                continue
+            thumb = img.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            thumb.save(path, THUMBNAIL_FORMAT.upper(), quality=85, method=6)
+
+def fetch_sprites(data_file=DATA_FILE, sprite_dir=SPRITE_DIR, max_workers=MAX_WORKERS):
+    with open(data_file) as f:
+        pokemon = [(p["id"], p["sprite_url"]) for p in json.load(f) if p.get("sprite_url")]
+
+    os.makedirs(sprite_dir, exist_ok=True)
+    failed = []
+    with requests.Session() as session, ThreadPoolExecutor(max_workers) as pool:
+        futures = {pool.submit(mirror_sprite, session, pid, url, sprite_dir): pid for pid, url in pokemon}
+        for future, pid in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(pid)
+                print(f"Failed to mirror sprite for Pokémon ID {pid}: {e}")
+
+    print(f" Mirrored {len(pokemon) - len(failed)} sprites to {sprite_dir}")
+    return failed
+
+if __name__ == "__main__":
+    fetch_sprites()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from time import time
+
+CACHE_DIR = r"C:\Users\kubag\Desktop\Vproj\http_cache"
+CACHE_TTL = 24 * 60 * 60
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+class ResponseCache:
+    """On-disk cache of GET response bodies keyed by URL.
+
+    Entries younger than `ttl` seconds are served without touching the network.
+    Older entries are revalidated with If-None-Match / If-Modified-Since, and a
+    304 reuses the stored body. The directory is kept under `max_bytes` by
+    evicting the least recently used entries.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0, "bytes_downloaded": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sizes = {
+            name: os.path.getsize(os.path.join(cache_dir, name))
+            for name in os.listdir(cache_dir) if name.endswith(".json")
+        }
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, url):
+        path = self._path(url)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _store(self, url, entry):
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.sizes[os.path.basename(path)] = os.path.getsize(path)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self.sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = sorted(self.sizes, key=lambda name: self._atime(name))
+        for name in by_age:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= self.sizes.pop(name)
+            self.stats["evicted"] += 1
+
+    def _atime(self, name):
+        try:
+            return os.path.getmtime(os.path.join(self.cache_dir, name))
+        except OSError:
+            return 0
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    @property
+    def downloads(self):
+        return self.stats["misses"]
+
+    def _is_fresh(self, entry):
+        return entry is not None and time() - entry["fetched_at"] < self.ttl
+
+    def get_fresh(self, url):
+        """Return the cached body for `url` if it is within the TTL, otherwise None."""
+        entry = self._load(url)
+        if self._is_fresh(entry):
+            self._count("hits")
+            return entry["body"]
+        return None
+
+    def get_text(self, session, url):
+        entry = self._load(url)
+        if self._is_fresh(entry):
+            self._count("hits")
+            return entry["body"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            entry["fetched_at"] = time()
+            self._store(url, entry)
+            return entry["body"]
+
+        response.raise_for_status()
+        self._count("misses")
+        self._count("bytes_downloaded", len(response.content))
+        entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time(),
+            "body": response.text,
+        }
+        self._store(url, entry)
+        return entry["body"]
+
+    def get_json(self, session, url):
+        return json.loads(self.get_text(session, url))
+
+    def report(self):
+        total = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        reused = self.stats["hits"] + self.stats["revalidated"]
+        rate = 100 * reused / total if total else 0
+        print(f" HTTP cache: {self.stats['hits']} fresh hits, {self.stats['revalidated']} revalidated (304), "
+              f"{self.stats['misses']} downloaded, {self.stats['evicted']} evicted "
+              f"- {rate:.1f}% reused, {self.stats['bytes_downloaded'] / 1024:.1f} KB downloaded")
@@ -0,0 +1,90 @@
+import json
+import re
+from json.decoder import scanstring
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SCALAR_END = re.compile(r"[,}\]\s]")
+_NON_STRUCTURAL = bytes(c for c in range(256) if chr(c) not in '"[]{}')
+
+
+def project(text, fields):
+    """Decode only the parts of a JSON object that `fields` asks for.
+
+    `fields` maps a key to True (keep the whole value) or to a nested
+    `fields` dict (keep part of an object). Everything else is stepped over
+    in the raw text without being turned into Python objects, so the large
+    `moves` / `game_indices` / `sprites` trees of a PokeAPI payload cost a
+    few string scans instead of thousands of dicts.
+
+    Skipping works by counting brackets, which is only exact when no string
+    contains a bracket or an escaped quote; other payloads fall back to a
+    full json.loads followed by the same projection.
+    """
+    if not _brackets_are_structural(text):
+        return _project_loaded(json.loads(text), fields)
+    value, _ = _project_object(text, _skip_ws(text, 0), fields)
+    return value
+
+
+def _brackets_are_structural(text):
+    # Keep only quotes and brackets: every string then shrinks to "" and
+    # dropping those pairs leaves no quote behind unless some string held a
+    # bracket. An escaped quote would break the pairing, so it bails out too.
+    raw = text.encode("utf-8")
+    if b'\\"' in raw:
+        return False
+    return b'"' not in raw.translate(None, _NON_STRUCTURAL).replace(b'""', b"")
+
+
+def _project_loaded(obj, fields):
+    out = {}
+    for key, sub in fields.items():
+        if key in obj:
+            value = obj[key]
+            out[key] = _project_loaded(value, sub) if isinstance(sub, dict) and isinstance(value, dict) else value
+    return out
+
+
+def _skip_ws(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _project_object(text, pos, fields):
+    if text[pos] != "{":
+        return _decoder.raw_decode(text, pos)
+    out = {}
+    pos = _skip_ws(text, pos + 1)
+    if text[pos] == "}":
+        return out, pos + 1
+    while True:
+        key, pos = scanstring(text, pos + 1)
+        pos = _skip_ws(text, _skip_ws(text, pos) + 1)
+        sub = fields.get(key)
+        if sub is True:
+            out[key], pos = _decoder.raw_decode(text, pos)
+        elif sub:
+            out[key], pos = _project_object(text, pos, sub)
+        else:
+            pos = _skip_value(text, pos)
+        pos = _skip_ws(text, pos)
+        if text[pos] == "}":
+            return out, pos + 1
+        pos = _skip_ws(text, pos + 1)
+
+
+def _skip_value(text, pos):
+    c = text[pos]
+    if c == '"':
+        return text.index('"', pos + 1) + 1
+    if c not in "[{":
+        return _SCALAR_END.search(text, pos).start()
+    close = "]" if c == "[" else "}"
+    depth = 1
+    scan = pos + 1
+    while True:
+        end = text.index(close, scan)
+        depth += text.count(c, scan, end) - 1
+        if depth == 0:
+            return end + 1
+        scan = end + 1
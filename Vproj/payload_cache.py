@@ -0,0 +1,83 @@
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.utils
+
+PAYLOAD_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class PayloadCache:
+    """In-memory LRU of serialized callback outputs, bounded by their JSON size.
+
+    Values are stored the way Dash would send them (plain dicts/lists after a
+    round trip through plotly's JSON encoder), so a hit skips building the
+    Plotly figures and components entirely. Each entry's size is its encoded
+    length; the least recently used entries are evicted once the total goes
+    over `max_bytes`. Cached values are shared between requests and must not
+    be mutated.
+    """
+
+    def __init__(self, max_bytes=PAYLOAD_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "oversized": 0}
+
+    def get(self, key, build):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+            self.stats["misses"] += 1
+
+        value, size = self.prepare(build())
+        with self.lock:
+            if size > self.max_bytes:
+                self.stats["oversized"] += 1
+                return value
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.stats["evictions"] += 1
+        return value
+
+    def prepare(self, value):
+        """The value to store for a freshly built one, and its size in bytes."""
+        encoded = json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder)
+        return json.loads(encoded), len(encoded.encode("utf-8"))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def report(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                bytes=self.total_bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=self.stats["hits"] / lookups if lookups else 0.0,
+            )
+
+
+class ArrayCache(PayloadCache):
+    """The same LRU for numpy arrays, bounded by their `nbytes`.
+
+    Arrays are stored as they are and made read-only, since every request
+    asking for the key gets the same one.
+    """
+
+    def prepare(self, value):
+        value.flags.writeable = False
+        return value, value.nbytes
@@ -0,0 +1,101 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSED_CACHE_MAX_BYTES = 16 * 1024 * 1024
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/x-javascript",
+                      "image/svg+xml")
+
+
+class ResponseCompressor:
+    """Compresses Flask responses with brotli (when installed) or gzip, picked from Accept-Encoding.
+
+    Bodies under `min_bytes` are sent as they are: the headers would eat most
+    of the saving. Responses carrying an ETag (layout, dependencies, component
+    scripts) have the same body every time, so their compressed bodies are
+    kept in an LRU bounded by `cache_max_bytes` and only compressed once; the
+    ETag is made weak since the encoded bytes differ from the original.
+    Callback responses are compressed per request.
+    """
+
+    def __init__(self, min_bytes=COMPRESS_MIN_BYTES, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY,
+                 cache_max_bytes=COMPRESSED_CACHE_MAX_BYTES):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_max_bytes = cache_max_bytes
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.stats = {"compressed": 0, "skipped": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def encode(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def cached_encode(self, key, data, encoding):
+        with self.lock:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return body
+        body = self.encode(data, encoding)
+        with self.lock:
+            if key not in self.cache and len(body) <= self.cache_max_bytes:
+                self.cache[key] = body
+                self.cache_bytes += len(body)
+                while self.cache_bytes > self.cache_max_bytes:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cache_bytes -= len(evicted)
+        return body
+
+    def compress(self, response, accept_encodings):
+        """Compress `response` in place if the client accepts it and it is worth it; returns the response."""
+        if not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or "Content-Encoding" in response.headers):
+            return response
+        encoding = accept_encodings.best_match(self.encodings)
+        data = response.get_data()
+        if encoding is None or len(data) < self.min_bytes:
+            with self.lock:
+                self.stats["skipped"] += 1
+            return response
+
+        etag, _ = response.get_etag()
+        if etag is not None:
+            body = self.cached_encode((etag, encoding), data, encoding)
+            response.set_etag(etag, weak=True)
+        else:
+            body = self.encode(data, encoding)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        with self.lock:
+            self.stats["compressed"] += 1
+            self.stats["bytes_in"] += len(data)
+            self.stats["bytes_out"] += len(body)
+        return response
+
+    def report(self):
+        with self.lock:
+            return dict(
+                self.stats,
+                encodings=self.encodings,
+                min_bytes=self.min_bytes,
+                cache_entries=len(self.cache),
+                cache_bytes=self.cache_bytes,
+                ratio=self.stats["bytes_out"] / self.stats["bytes_in"] if self.stats["bytes_in"] else 1.0,
+            )
@@ -0,0 +1,61 @@
+"""Regression checks for the performance work that benchmarks.py measures; run with `python -m pytest`.
+
+benchmarks.py prints the tables, these fail when the behaviour behind them regresses.
+"""
+import os
+import statistics
+
+import pytest
+
+import benchmarks
+
+
+@pytest.fixture(scope="module")
+def client():
+    import APPF
+    return APPF.server.test_client()
+
+
+@pytest.fixture(scope="module")
+def dependencies(client):
+    return client.get("/_dash-dependencies").get_json()
+
+
+def test_no_server_callback_takes_an_all_pattern(dependencies):
+    for dep in dependencies:
+        if dep.get("clientside_function"):
+            continue
+        for spec in dep["inputs"] + dep["state"]:
+            assert '"ALL' not in str(spec["id"]), f"server callback {dep['output']} takes {spec['id']}"
+
+
+def test_image_click_request_does_not_grow_with_the_gallery(client, dependencies):
+    # Only plain component ids in the router's inputs and state: pattern ids
+    # would send one entry per rendered image.
+    router = next(dep for dep in dependencies
+                  if not dep.get("clientside_function") and {"id": "clicked_image", "property": "data"} in dep["inputs"])
+    for spec in router["inputs"] + router["state"]:
+        assert isinstance(spec["id"], str) and not spec["id"].startswith("{"), spec
+
+    request = benchmarks._callback_request(router, {
+        "clicked_image.data": {"type": "gallery_img", "index": 25, "n_clicks": 1},
+        "comparison_store.data": {"pokemon1": None, "pokemon2": None},
+    })
+    response = client.post("/_dash-update-component", json=request)
+    assert response.status_code == 200, response.data[:200]
+    assert response.get_json()["response"]["selected_pokemon_id"]["data"] == 25
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="PSS is read from Linux /proc")
+def test_mapped_data_is_shared_between_workers(tmp_path, rows=300_000, workers=4):
+    paths = benchmarks._worker_files(str(tmp_path), rows)
+    data = {count: benchmarks._workers_pss_mb("arrow", paths["arrow"], count)
+            - benchmarks._workers_pss_mb("baseline", "", count) for count in (1, workers)}
+    assert data[workers] <= 1.5 * data[1], f"mapped data grew from {data[1]:.1f} MB to {data[workers]:.1f} MB"
+
+
+def test_cold_start_is_within_budget(repeat=5):
+    runs = benchmarks._startup_runs(benchmarks._startup_env(), repeat)
+    first_response = statistics.median(run["first_response"] for run in runs)
+    assert first_response <= benchmarks.STARTUP_BUDGET_S, \
+        f"cold start took {first_response:.2f} s, over the {benchmarks.STARTUP_BUDGET_S:.2f} s budget"
@@ -0,0 +1,65 @@
+"""Production entry point for the dashboard.
+
+    python wsgi.py --workers 4 --threads 4
+
+or, with gunicorn's own CLI:
+
+    gunicorn --preload --workers 4 --threads 4 --bind 0.0.0.0:8050 "wsgi:create_app()"
+
+Either way the dataset is mapped once in the master process before it forks.
+The Arrow file is memory-mapped, so its columns sit in the page cache once
+however many workers there are. The aggregates, search results and payload
+and figure caches are built per worker on first use. Each worker also watches
+the data files and swaps in the new dataset on its own after clean_data1.py
+rewrites them (check /_data-version on each worker; like the other diagnostic
+routes it is only served with STATS_ROUTES=1). gunicorn needs a Unix host; on
+Windows use the dev server (python APPF.py).
+"""
+import argparse
+import gc
+import os
+
+BIND = "0.0.0.0:8050"
+WORKERS = min(4, os.cpu_count() or 1)
+THREADS = 4
+
+
+def create_app():
+    """WSGI factory: import APPF (mapping the data file) and return its Flask server."""
+    import APPF
+    return APPF.server
+
+
+def serve(bind=BIND, workers=WORKERS, threads=THREADS):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("wsgi.py needs gunicorn (pip install gunicorn, Unix only); "
+                         "use python APPF.py for the dev server")
+
+    server = create_app()
+    # Everything loaded so far lives for the life of the process; keeping it
+    # out of the collector stops gc passes in the workers from touching (and
+    # so un-sharing) the pages it sits on.
+    gc.freeze()
+
+    class DashApplication(BaseApplication):
+        def load_config(self):
+            options = {"bind": bind, "workers": workers, "threads": threads, "preload_app": True}
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return server
+
+    print(f" Serving on {bind} with {workers} workers x {threads} threads")
+    DashApplication().run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Pokémon dashboard with gunicorn (debug off).")
+    parser.add_argument("--bind", default=BIND)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    args = parser.parse_args()
+    serve(args.bind, args.workers, args.threads)